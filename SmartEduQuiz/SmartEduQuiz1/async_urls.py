@@ -0,0 +1,13 @@
+"""Root URLconf with the async student views whatever QUIZ_ASYNC_VIEWS says.
+
+For tests and benchmarks: override_settings(ROOT_URLCONF='SmartEduQuiz1.async_urls').
+"""
+from django.contrib import admin
+from django.urls import path
+
+from quiz import async_views, urls
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    *urls.build_urlpatterns(async_views),
+]
@@ -20,6 +20,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quiz.middleware.RequestTimingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -34,7 +35,8 @@ ROOT_URLCONF = 'SmartEduQuiz1.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request when QUIZ_REQUEST_TIMING is on.
+        'BACKEND': 'quiz.middleware.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'quiz/templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -53,10 +55,46 @@ WSGI_APPLICATION = 'SmartEduQuiz1.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SMARTEDUQUIZ_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Production SQLite mode (SMARTEDUQUIZ_DB_MODE=production): WAL journaling so
+# readers never block the writer, a busy timeout instead of immediate
+# "database is locked" errors, write transactions that take the lock up front,
+# and persistent, health-checked connections.
+SQLITE_PRODUCTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+]
+
+if os.environ.get('SMARTEDUQUIZ_DB_MODE') == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('SMARTEDUQUIZ_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(SQLITE_PRODUCTION_PRAGMAS),
+        },
+    })
+
+# Point these at a shared backend (e.g. Redis or Memcached) when running
+# several worker processes so cached data and counters are shared.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('SMARTEDUQUIZ_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SMARTEDUQUIZ_CACHE_LOCATION', 'smarteduquiz'),
+    }
+}
+
+# Loads the user and their Profile in one query on every authenticated request.
+AUTHENTICATION_BACKENDS = ['quiz.backends.ProfileBackend']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -88,4 +126,63 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-AUTH_USER_MODEL = 'quiz.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'quiz.User'
+# Seconds an unsubmitted quiz attempt is kept before it is treated as abandoned.
+QUIZ_PROGRESS_TTL = 60 * 60 * 24
+# Starting an attempt deletes abandoned ones at most once per this many seconds
+# per cache; the purge_quiz_progress command can do it on a schedule instead.
+QUIZ_PROGRESS_PURGE_INTERVAL = 60 * 15
+
+# Seconds the class-wide teacher dashboard figures may be served from cache.
+TEACHER_SNAPSHOT_TTL = 300
+
+# Seconds a process serves its in-memory category list before re-checking the
+# table for changes made by other processes; its own changes show at once.
+QUIZ_CATEGORY_CHECK_INTERVAL = 5
+
+# Route the student quiz-taking endpoints to quiz.async_views. Turn this on
+# when serving SmartEduQuiz1.asgi:application with an ASGI server.
+QUIZ_ASYNC_VIEWS = os.environ.get('SMARTEDUQUIZ_ASYNC_VIEWS') == '1'
+
+# Queue final quiz submissions for `manage.py run_grader` instead of grading
+# them inside the request, to absorb end-of-exam submission spikes.
+QUIZ_QUEUED_GRADING = os.environ.get('SMARTEDUQUIZ_QUEUED_GRADING') == '1'
+
+# Pick each new attempt's questions weighted by historical difficulty and the
+# student's accuracy in the category (quiz.adaptive) instead of uniformly.
+# `manage.py run_grader` folds new attempts into the weights while idle; without
+# it, run `manage.py update_item_analysis` periodically to keep them fresh.
+QUIZ_ADAPTIVE_SELECTION = os.environ.get('SMARTEDUQUIZ_ADAPTIVE_SELECTION') == '1'
+# Seconds a process keeps drawing from a cached adaptive index that the
+# weights have moved past before it rebuilds the index itself.
+QUIZ_ADAPTIVE_REBUILD_INTERVAL = 60 * 5
+
+# Per-request query count, DB time and template time in a Server-Timing
+# header (quiz.middleware). Requests over either threshold are also logged to
+# QUIZ_SLOW_REQUEST_LOG as JSON lines. Off by default; the middleware then
+# drops out of the stack entirely.
+QUIZ_REQUEST_TIMING = os.environ.get('SMARTEDUQUIZ_REQUEST_TIMING') == '1'
+QUIZ_SLOW_REQUEST_MS = int(os.environ.get('SMARTEDUQUIZ_SLOW_REQUEST_MS', 500))
+QUIZ_SLOW_REQUEST_QUERIES = int(os.environ.get('SMARTEDUQUIZ_SLOW_REQUEST_QUERIES', 50))
+QUIZ_SLOW_REQUEST_LOG = os.environ.get('SMARTEDUQUIZ_SLOW_REQUEST_LOG', BASE_DIR / 'slow_requests.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {'format': '{"time": "%(asctime)s", "request": %(message)s}'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': QUIZ_SLOW_REQUEST_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json_line',
+        },
+    },
+    'loggers': {
+        'quiz.slow_requests': {'handlers': ['slow_requests'], 'level': 'WARNING', 'propagate': False},
+    },
+}
@@ -0,0 +1,192 @@
+"""Adaptive question selection from precomputed per-quiz alias tables.
+
+Each question is weighted by how close its historical difficulty (share of
+correct answers, from QuestionStats) is to a target picked by the student's
+accuracy in the quiz's category: weaker students are steered towards easier
+questions, stronger ones towards harder ones. The quiz's index holds one
+Vose alias table per accuracy bucket, so an attempt draws N questions in
+O(N) without reading answer history. Graded attempts are folded into
+those sums off the request path, by run_grader or update_item_analysis,
+which also refresh the cached index. The index records the item analysis
+watermark it was built at; a process whose cached copy has fallen behind
+keeps serving it and rebuilds at most once per QUIZ_ADAPTIVE_REBUILD_INTERVAL.
+"""
+import bisect
+import math
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CategoryStats, ItemAnalysisWatermark, Question
+from .sampling import QUESTIONS_PER_ATTEMPT
+
+INDEX_CACHE_TIMEOUT = 60 * 60 * 24
+# Upper bounds of the student accuracy buckets, and the question difficulty
+# each of the resulting four buckets is steered towards.
+ACCURACY_BUCKETS = (0.5, 0.7, 0.85)
+TARGET_DIFFICULTY = (0.75, 0.6, 0.45, 0.3)
+DEFAULT_BUCKET = 1
+SPREAD = 0.2
+# Keeps every question reachable, however far from the target it is.
+MIN_WEIGHT = 0.05
+
+
+def enabled():
+    return getattr(settings, 'QUIZ_ADAPTIVE_SELECTION', False)
+
+
+def _key(quiz_id):
+    return f'adaptive_index:{quiz_id}'
+
+
+def _rebuilt_key(quiz_id):
+    return f'adaptive_index_rebuilt:{quiz_id}'
+
+
+def invalidate(quiz_id):
+    cache.delete(_key(quiz_id))
+
+
+def _alias_table(weights):
+    """Build Vose's alias table: (probabilities, aliases) for O(1) weighted draws."""
+    count = len(weights)
+    total = sum(weights)
+    scaled = [weight * count / total for weight in weights]
+    prob = [1.0] * count
+    alias = list(range(count))
+    small = [i for i, value in enumerate(scaled) if value < 1]
+    large = [i for i, value in enumerate(scaled) if value >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] += scaled[less] - 1
+        (small if scaled[more] < 1 else large).append(more)
+    return prob, alias
+
+
+def _weight(difficulty, target):
+    return MIN_WEIGHT + math.exp(-0.5 * ((difficulty - target) / SPREAD) ** 2)
+
+
+def _index_rows(quiz):
+    return Question.objects.filter(quiz=quiz).order_by('id').values_list(
+        'id', 'stats__responses', 'stats__correct'
+    )
+
+
+def _watermark(quiz):
+    return ItemAnalysisWatermark.objects.filter(quiz_id=quiz.id).values_list('last_attempt_id', flat=True)
+
+
+def _same_bank(index, quiz):
+    return index is not None and index['bank_version'] == quiz.bank_version
+
+
+def _build_index(quiz, watermark, rows):
+    ids = []
+    difficulties = []
+    for question_id, responses, correct in rows:
+        ids.append(question_id)
+        # Laplace smoothing: an unseen question counts as medium difficulty.
+        difficulties.append(((correct or 0) + 1) / ((responses or 0) + 2))
+    return {
+        'bank_version': quiz.bank_version,
+        'watermark': watermark,
+        'ids': ids,
+        'tables': [
+            _alias_table([_weight(difficulty, target) for difficulty in difficulties])
+            for target in TARGET_DIFFICULTY
+        ] if ids else [],
+    }
+
+
+def bucket_for(accuracy):
+    """Map a category accuracy (0-1, or None when unknown) to an index into TARGET_DIFFICULTY."""
+    if accuracy is None:
+        return DEFAULT_BUCKET
+    return bisect.bisect_right(ACCURACY_BUCKETS, accuracy)
+
+
+def draw(index, bucket, seed, count=QUESTIONS_PER_ATTEMPT):
+    """Draw up to ``count`` distinct question ids from ``index`` with ``bucket``'s weights."""
+    ids = index['ids']
+    rng = random.Random(seed)
+    if count >= len(ids):
+        return rng.sample(ids, len(ids))
+    prob, alias = index['tables'][bucket]
+    chosen = []
+    seen = set()
+    for _ in range(count * 8):
+        i = rng.randrange(len(ids))
+        if rng.random() >= prob[i]:
+            i = alias[i]
+        if i not in seen:
+            seen.add(i)
+            chosen.append(ids[i])
+            if len(chosen) == count:
+                return chosen
+    # Only reached when a few questions carry almost all the weight.
+    rest = [question_id for i, question_id in enumerate(ids) if i not in seen]
+    return chosen + rng.sample(rest, count - len(chosen))
+
+
+def _accuracy(row):
+    if row is None or not row[1]:
+        return None
+    return row[0] / row[1]
+
+
+def _category_row(user, quiz):
+    return CategoryStats.objects.filter(user=user, category_id=quiz.category_id).values_list(
+        'score_total', 'question_total'
+    )
+
+
+def refresh(quiz):
+    """Rebuild and cache the quiz's index from its current statistics."""
+    index = _build_index(quiz, _watermark(quiz).first() or 0, _index_rows(quiz))
+    cache.set(_key(quiz.id), index, INDEX_CACHE_TIMEOUT)
+    cache.set(_rebuilt_key(quiz.id), True, settings.QUIZ_ADAPTIVE_REBUILD_INTERVAL)
+    return index
+
+
+def get_index(quiz):
+    """The quiz's cached index, rebuilt only for a changed bank or once per rebuild interval."""
+    index = cache.get(_key(quiz.id))
+    if _same_bank(index, quiz):
+        if index['watermark'] == (_watermark(quiz).first() or 0):
+            return index
+        # Behind the folded statistics: serve it anyway unless a rebuild is due.
+        if not cache.add(_rebuilt_key(quiz.id), True, settings.QUIZ_ADAPTIVE_REBUILD_INTERVAL):
+            return index
+    return refresh(quiz)
+
+
+def sample_question_ids(quiz, user, seed, count=QUESTIONS_PER_ATTEMPT):
+    """Pick the question ids of a new adaptive attempt of ``user`` on ``quiz``."""
+    bucket = bucket_for(_accuracy(_category_row(user, quiz).first()))
+    return draw(get_index(quiz), bucket, seed, count)
+
+
+async def arefresh(quiz):
+    index = _build_index(quiz, await _watermark(quiz).afirst() or 0, [row async for row in _index_rows(quiz)])
+    await cache.aset(_key(quiz.id), index, INDEX_CACHE_TIMEOUT)
+    await cache.aset(_rebuilt_key(quiz.id), True, settings.QUIZ_ADAPTIVE_REBUILD_INTERVAL)
+    return index
+
+
+async def aget_index(quiz):
+    index = await cache.aget(_key(quiz.id))
+    if _same_bank(index, quiz):
+        if index['watermark'] == (await _watermark(quiz).afirst() or 0):
+            return index
+        if not await cache.aadd(_rebuilt_key(quiz.id), True, settings.QUIZ_ADAPTIVE_REBUILD_INTERVAL):
+            return index
+    return await arefresh(quiz)
+
+
+async def asample_question_ids(quiz, user, seed, count=QUESTIONS_PER_ATTEMPT):
+    bucket = bucket_for(_accuracy(await _category_row(user, quiz).afirst()))
+    return draw(await aget_index(quiz), bucket, seed, count)
@@ -1,10 +1,133 @@
-from django.contrib import admin
-from .models import Quiz, Question, UserAnswer, QuizAttempt
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from .grading import delete_attempts, regrade_attempts
+from .models import Question, Quiz, QuizAttempt, UserAnswer
+
 User = get_user_model()
 
+# Filtered changelists count at most this many rows; later pages are not linked.
+ADMIN_COUNT_LIMIT = 10000
+
+
+def _estimated_rows(model):
+    """Cheap row count for a whole table: SQLite's ANALYZE statistics, else the highest id."""
+    if connection.vendor == 'sqlite':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [model._meta.db_table])
+                row = cursor.fetchone()
+        except DatabaseError:
+            # ANALYZE has never run, so there is no statistics table.
+            row = None
+        if row:
+            return int(row[0].split()[0])
+    return model._default_manager.aggregate(last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs COUNT(*) over a whole large table."""
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            return _estimated_rows(self.object_list.model)
+        return self.object_list[:ADMIN_COUNT_LIMIT].count()
+
+
+class UsernameFilter(admin.SimpleListFilter):
+    """Exact-username text box, in place of a list with one entry per user."""
+    title = 'student'
+    parameter_name = 'username'
+    template = 'admin/quiz/input_filter.html'
+    lookup = 'user__username'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # Keep the other filters when this one is submitted; restart at page one.
+        self.hidden_params = [
+            (name, value) for name, value in request.GET.items() if name not in (self.parameter_name, 'p')
+        ]
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+
+class AnswerUsernameFilter(UsernameFilter):
+    lookup = 'attempt__user__username'
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # The stock action loads every selected row and its relations first.
+        actions.pop('delete_selected', None)
+        return actions
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'quiz', 'score', 'total_questions', 'completed_at')
+    list_select_related = ('user', 'quiz')
+    list_filter = ('quiz', UsernameFilter, ('completed_at', admin.DateFieldListFilter))
+    raw_id_fields = ('user', 'quiz')
+    actions = ('regrade', 'delete_attempts')
+
+    @admin.action(description="Regrade selected attempts against the current answer key")
+    def regrade(self, request, queryset):
+        count = regrade_attempts(QuizAttempt.objects.filter(id__in=queryset.values('id')))
+        self.message_user(request, f"Regraded {count} attempts.", messages.SUCCESS)
+
+    @admin.action(description="Delete selected attempts and their answers", permissions=['delete'])
+    def delete_attempts(self, request, queryset):
+        count = delete_attempts(queryset)
+        self.message_user(request, f"Deleted {count} attempts.", messages.SUCCESS)
+
+
+@admin.register(UserAnswer)
+class UserAnswerAdmin(LargeTableAdmin):
+    list_display = ('id', 'attempt', 'question', 'selected_answer', 'is_correct')
+    list_select_related = ('attempt__user', 'attempt__quiz', 'question')
+    list_filter = ('attempt__quiz', AnswerUsernameFilter, ('attempt__completed_at', admin.DateFieldListFilter))
+    raw_id_fields = ('attempt', 'question')
+    actions = ('regrade_attempts',)
+
+    @admin.action(description="Regrade the attempts of the selected answers")
+    def regrade_attempts(self, request, queryset):
+        count = regrade_attempts(QuizAttempt.objects.filter(id__in=queryset.values('attempt_id')))
+        self.message_user(request, f"Regraded {count} attempts.", messages.SUCCESS)
+
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ('title', 'category', 'created_by', 'created_at')
+    list_select_related = ('category', 'created_by')
+    raw_id_fields = ('created_by',)
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_display = ('text', 'quiz', 'correct_answer')
+    list_select_related = ('quiz',)
+    list_filter = ('quiz',)
+    raw_id_fields = ('quiz',)
+
+
 admin.site.register(User)
-admin.site.register(Quiz)
-admin.site.register(Question)
-admin.site.register(UserAnswer)
-admin.site.register(QuizAttempt)
\ No newline at end of file
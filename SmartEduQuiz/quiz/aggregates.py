@@ -0,0 +1,157 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import CategoryStats, Profile, Quiz, QuizAttempt, StudentStats
+
+
+def _increment(model, lookup, score, total_questions, changes=None, initial=None):
+    """Add one attempt to the counters row identified by ``lookup``, creating it if needed."""
+    changes = {
+        'attempt_count': F('attempt_count') + 1,
+        'score_total': F('score_total') + score,
+        'question_total': F('question_total') + total_questions,
+        **(changes or {}),
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(
+                attempt_count=1, score_total=score, question_total=total_questions,
+                **lookup, **(initial or {})
+            )
+    except IntegrityError:
+        # Another request created the row between our update and insert.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_attempt(attempt, category_id=None, class_section=None):
+    """Fold a finished attempt into the per-student and per-category totals.
+
+    Call inside the transaction that saves the attempt so the totals never
+    drift from the attempt table. The student's stored section is only
+    replaced when ``class_section`` is given.
+    """
+    if category_id is None:
+        category_id = attempt.quiz.category_id
+    changes = {
+        # Evaluated against the pre-update row, so this is the new mean.
+        'average_score': Cast(F('score_total') + attempt.score, FloatField()) / (F('attempt_count') + 1),
+    }
+    initial = {'average_score': attempt.score}
+    if class_section is not None:
+        changes['class_section'] = initial['class_section'] = class_section
+    _increment(
+        StudentStats,
+        {'user_id': attempt.user_id},
+        attempt.score,
+        attempt.total_questions,
+        changes=changes,
+        initial=initial,
+    )
+    _increment(
+        CategoryStats,
+        {'user_id': attempt.user_id, 'category_id': category_id},
+        attempt.score,
+        attempt.total_questions,
+    )
+
+
+def _decrement(model, lookup, score, total_questions, changes=None):
+    """Take one attempt out of the counters row identified by ``lookup``; drop the row once it is empty."""
+    model.objects.filter(**lookup).update(
+        attempt_count=F('attempt_count') - 1,
+        score_total=F('score_total') - score,
+        question_total=F('question_total') - total_questions,
+        **(changes or {}),
+    )
+    model.objects.filter(**lookup, attempt_count=0).delete()
+
+
+def remove_attempt(attempt):
+    """Undo record_attempt for a deleted attempt, keeping the totals in step with the attempt table.
+
+    Runs from QuizAttempt's post_delete signal, so attempts removed in the
+    admin or by a user, quiz or category cascade are covered; bulk deletes
+    that skip signals refresh the totals themselves (see delete_attempts).
+    """
+    category_id = Quiz.objects.filter(id=attempt.quiz_id).values_list('category_id', flat=True).first()
+    _decrement(
+        StudentStats,
+        {'user_id': attempt.user_id},
+        attempt.score,
+        attempt.total_questions,
+        changes={'average_score': Case(
+            When(attempt_count__gt=1,
+                 then=Cast(F('score_total') - attempt.score, FloatField()) / (F('attempt_count') - 1)),
+            default=Value(0.0),
+        )},
+    )
+    if category_id is not None:
+        _decrement(
+            CategoryStats,
+            {'user_id': attempt.user_id, 'category_id': category_id},
+            attempt.score,
+            attempt.total_questions,
+        )
+
+
+def _totals(queryset, *group_by):
+    return queryset.values(*group_by).annotate(
+        attempts=Count('id'),
+        score=Sum('score'),
+        questions=Sum('total_questions'),
+    ).order_by()
+
+
+def _rebuild(attempts, profiles, batch_size):
+    sections = dict(profiles.values_list('user_id', 'class_section'))
+    StudentStats.objects.bulk_create(
+        (
+            StudentStats(
+                user_id=row['user'],
+                attempt_count=row['attempts'],
+                score_total=row['score'] or 0,
+                question_total=row['questions'] or 0,
+                average_score=(row['score'] or 0) / row['attempts'],
+                class_section=sections.get(row['user']),
+            )
+            for row in _totals(attempts, 'user').iterator()
+        ),
+        batch_size=batch_size,
+    )
+    CategoryStats.objects.bulk_create(
+        (
+            CategoryStats(
+                user_id=row['user'],
+                category_id=row['quiz__category'],
+                attempt_count=row['attempts'],
+                score_total=row['score'] or 0,
+                question_total=row['questions'] or 0,
+            )
+            for row in _totals(attempts, 'user', 'quiz__category').iterator()
+        ),
+        batch_size=batch_size,
+    )
+
+
+@transaction.atomic
+def rebuild_aggregates(batch_size=1000):
+    """Recompute every totals row from the attempt history."""
+    StudentStats.objects.all().delete()
+    CategoryStats.objects.all().delete()
+    _rebuild(QuizAttempt.objects.all(), Profile.objects.all(), batch_size)
+
+
+@transaction.atomic
+def refresh_student_totals(user_ids, batch_size=1000):
+    """Recompute the totals rows of the given students only."""
+    user_ids = list(user_ids)
+    StudentStats.objects.filter(user_id__in=user_ids).delete()
+    CategoryStats.objects.filter(user_id__in=user_ids).delete()
+    _rebuild(
+        QuizAttempt.objects.filter(user_id__in=user_ids),
+        Profile.objects.filter(user_id__in=user_ids),
+        batch_size,
+    )
@@ -0,0 +1,70 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Sum
+
+from .models import Profile, Quiz, QuizAttempt, StudentStats, User
+
+SNAPSHOT_TTL = getattr(settings, 'TEACHER_SNAPSHOT_TTL', 300)
+VERSION_KEY = 'teacher_snapshot:version'
+
+
+def invalidate_snapshot():
+    """Make the next dashboard load recompute the class-wide figures."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _compute_class_snapshot():
+    totals = StudentStats.objects.aggregate(score=Sum('score_total'), attempts=Sum('attempt_count'))
+    weakest = QuizAttempt.objects.filter(score__gt=0).values(
+        'quiz__category', 'quiz__category__name'
+    ).annotate(avg_score=Avg('score')).order_by('avg_score').first()
+
+    student_progress = list(
+        QuizAttempt.objects.values('user', 'quiz__title').annotate(score=Avg('score')).order_by('-score')[:3]
+    )
+    names = dict(
+        User.objects.filter(id__in={row['user'] for row in student_progress}).values_list('id', 'first_name')
+    )
+    recent_quizzes = list(
+        QuizAttempt.objects.values('quiz').annotate(avg_score=Avg('score')).order_by('-quiz__created_at')[:3]
+    )
+    titles = dict(
+        Quiz.objects.filter(id__in={row['quiz'] for row in recent_quizzes}).values_list('id', 'title')
+    )
+    return {
+        'total_students': Profile.objects.filter(role='student').count(),
+        'avg_class_score': round(totals['score'] / totals['attempts'], 2) if totals['attempts'] else 0,
+        'weakest_subject': weakest['quiz__category__name'] if weakest else 'N/A',
+        'student_progress': [
+            {
+                'student_name': names.get(row['user'], ''),
+                'quiz_title': row['quiz__title'],
+                'score': round(row['score'], 2),
+            }
+            for row in student_progress
+        ],
+        'recent_quizzes': [
+            {'quiz_title': titles.get(row['quiz'], ''), 'avg_score': round(row['avg_score'], 2)}
+            for row in recent_quizzes
+        ],
+    }
+
+
+def class_snapshot():
+    """Return the class-wide dashboard figures, computed at most once per TTL or change."""
+    key = f'teacher_snapshot:{_version()}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _compute_class_snapshot()
+        cache.set(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
@@ -0,0 +1,229 @@
+"""Pack the answers of old attempts into one ArchivedAnswers row each, and back.
+
+An archived answer is stored as the index of the option it picked plus the id
+of an ArchivedOptions row holding the question's options at archive time, so
+restoring, reviewing, exporting or regrading it yields the text that was
+picked even after the options are edited. Readers use attempt_answers() and
+selections(), which work the same whether an attempt's answers are live
+UserAnswer rows or archived.
+"""
+import hashlib
+import json
+
+import numpy as np
+from django.db import transaction
+
+from .models import ArchivedAnswers, ArchivedOptions, Question, QuizAttempt, UserAnswer
+
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_AFTER_DAYS = 365
+OPTION_COLUMNS = ('option1', 'option2', 'option3', 'option4')
+# Option codes past the four option indices.
+BLANK = 254
+OTHER = 255
+
+
+def _load_options(question_ids):
+    """Map question id to its four option texts."""
+    rows = Question.objects.filter(id__in=question_ids).values_list('id', *OPTION_COLUMNS)
+    return {question_id: options for question_id, *options in rows}
+
+
+def _digest(options):
+    return hashlib.blake2b(json.dumps(options).encode(), digest_size=16).hexdigest()
+
+
+def _option_set_ids(options):
+    """Map each question in ``options`` to the ArchivedOptions row of its current wording, creating missing ones."""
+    digests = {question_id: _digest(choices) for question_id, choices in options.items()}
+    ArchivedOptions.objects.bulk_create(
+        [ArchivedOptions(question_id=question_id, digest=digests[question_id], options=choices)
+         for question_id, choices in options.items()],
+        ignore_conflicts=True,
+    )
+    rows = ArchivedOptions.objects.filter(question_id__in=list(options)).values_list('id', 'question_id', 'digest')
+    return {question_id: set_id for set_id, question_id, digest in rows if digests[question_id] == digest}
+
+
+def load_option_sets(records):
+    """Map the ArchivedOptions ids ``records`` refer to onto their option texts."""
+    set_ids = {set_id for record in records for set_id in option_set_ids(record)}
+    return dict(ArchivedOptions.objects.filter(id__in=set_ids).values_list('id', 'options'))
+
+
+def pack(answers, options, option_sets=None):
+    """Build an unsaved ArchivedAnswers from (question_id, selected_answer, is_correct) tuples.
+
+    ``options`` maps question ids to their option texts and ``option_sets``
+    to the ArchivedOptions ids of that wording.
+    """
+    option_sets = option_sets or {}
+    codes = []
+    other = {}
+    for position, (question_id, selected, _) in enumerate(answers):
+        choices = options.get(question_id, ())
+        if selected in choices:
+            codes.append(choices.index(selected))
+        elif not selected:
+            codes.append(BLANK)
+        else:
+            codes.append(OTHER)
+            other[str(position)] = selected
+    return ArchivedAnswers(
+        question_ids=np.array([question_id for question_id, _, _ in answers], dtype='<u4').tobytes(),
+        options=bytes(codes),
+        option_sets=np.array(
+            [option_sets.get(question_id, 0) for question_id, _, _ in answers], dtype='<u4'
+        ).tobytes() if option_sets else b'',
+        correct=np.packbits(np.array([correct for _, _, correct in answers], dtype=bool), bitorder='little').tobytes(),
+        other_answers=other,
+    )
+
+
+def unpack(question_ids, options, correct):
+    """Return the packed question ids, option codes and correctness as NumPy arrays."""
+    codes = np.frombuffer(options, dtype=np.uint8)
+    return (
+        np.frombuffer(question_ids, dtype='<u4').astype(np.int64),
+        codes,
+        np.unpackbits(np.frombuffer(correct, dtype=np.uint8), count=len(codes), bitorder='little').astype(bool),
+    )
+
+
+def option_set_ids(record):
+    return np.frombuffer(record.option_sets, dtype='<u4').tolist()
+
+
+def _entries(record, texts, option_sets):
+    """Yield (position, question_id, selected_answer or None if the question is gone, is_correct)."""
+    ids, codes, flags = unpack(record.question_ids, record.options, record.correct)
+    set_ids = option_set_ids(record)
+    for position, (question_id, code, is_correct) in enumerate(zip(ids.tolist(), codes.tolist(), flags.tolist())):
+        # An option set is deleted along with its question.
+        choices = option_sets.get(set_ids[position]) if set_ids else texts.get(question_id)
+        if choices is None:
+            selected = None
+        elif code < len(choices):
+            selected = choices[code]
+        elif code == BLANK:
+            selected = ''
+        else:
+            selected = record.other_answers.get(str(position), '')
+        yield position, question_id, selected, is_correct
+
+
+def selections(record, texts, option_sets):
+    """Yield (question_id, selected_answer, is_correct) for an ArchivedAnswers record.
+
+    ``option_sets`` maps ArchivedOptions ids to the option texts they hold
+    (see load_option_sets), and ``texts`` question ids to their current
+    option texts, for records archived without option sets. Answers to
+    questions deleted since are skipped, as their live rows would be.
+    """
+    for _, question_id, selected, is_correct in _entries(record, texts, option_sets):
+        if selected is not None:
+            yield question_id, selected, is_correct
+
+
+def question_ids(record):
+    return unpack(record.question_ids, record.options, record.correct)[0].tolist()
+
+
+def attempt_answers(attempt):
+    """Return an attempt's answers as UserAnswer objects with their question, in answer order."""
+    answers = list(attempt.answers.select_related('question').order_by('id'))
+    # Grading writes a row for every question, so no rows means archived (or empty).
+    if answers or not attempt.total_questions:
+        return answers
+    archived = ArchivedAnswers.objects.filter(attempt=attempt).first()
+    if archived is None:
+        return []
+    questions = Question.objects.in_bulk(set(question_ids(archived)))
+    texts = {
+        question_id: [getattr(question, column) for column in OPTION_COLUMNS]
+        for question_id, question in questions.items()
+    }
+    return [
+        UserAnswer(attempt=attempt, question=questions[question_id], selected_answer=selected, is_correct=is_correct)
+        for question_id, selected, is_correct in selections(archived, texts, load_option_sets([archived]))
+    ]
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Pack the answers of up to ``batch_size`` live attempts completed before ``cutoff``.
+
+    Returns the number of attempts archived; 0 when none are left.
+    """
+    with transaction.atomic():
+        attempt_ids = list(
+            QuizAttempt.objects.filter(completed_at__lt=cutoff, archived_answers__isnull=True)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not attempt_ids:
+            return 0
+        answers = {attempt_id: [] for attempt_id in attempt_ids}
+        rows = UserAnswer.objects.filter(attempt_id__in=attempt_ids).order_by('id').values_list(
+            'attempt_id', 'question_id', 'selected_answer', 'is_correct'
+        )
+        for attempt_id, question_id, selected, is_correct in rows:
+            answers[attempt_id].append((question_id, selected, is_correct))
+        options = _load_options({question_id for packed in answers.values() for question_id, _, _ in packed})
+        option_sets = _option_set_ids(options)
+        records = []
+        for attempt_id, packed in answers.items():
+            record = pack(packed, options, option_sets)
+            record.attempt_id = attempt_id
+            records.append(record)
+        ArchivedAnswers.objects.bulk_create(records)
+        UserAnswer.objects.filter(attempt_id__in=attempt_ids).delete()
+    return len(attempt_ids)
+
+
+def restore_batch(cutoff=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Unpack up to ``batch_size`` archived attempts (completed before ``cutoff``, if given).
+
+    Returns the number of attempts restored to UserAnswer rows; 0 when none are left.
+    """
+    archived = ArchivedAnswers.objects.order_by('attempt_id')
+    if cutoff is not None:
+        archived = archived.filter(attempt__completed_at__lt=cutoff)
+    with transaction.atomic():
+        records = list(archived[:batch_size])
+        if not records:
+            return 0
+        options = _load_options({question_id for record in records for question_id in question_ids(record)})
+        option_sets = load_option_sets(records)
+        UserAnswer.objects.bulk_create([
+            UserAnswer(attempt_id=record.attempt_id, question_id=question_id, selected_answer=selected,
+                       is_correct=is_correct)
+            for record in records
+            for question_id, selected, is_correct in selections(record, options, option_sets)
+        ])
+        ArchivedAnswers.objects.filter(attempt_id__in=[record.attempt_id for record in records]).delete()
+    return len(records)
+
+
+def regrade(attempt_ids):
+    """Re-mark the archived answers of ``attempt_ids`` against the current answer key and rescore them."""
+    records = list(ArchivedAnswers.objects.filter(attempt_id__in=attempt_ids))
+    if not records:
+        return
+    rows = Question.objects.filter(
+        id__in={question_id for record in records for question_id in question_ids(record)}
+    ).values_list('id', 'correct_answer', *OPTION_COLUMNS)
+    keys = {}
+    texts = {}
+    for question_id, correct_answer, *options in rows:
+        keys[question_id] = correct_answer
+        texts[question_id] = options
+    option_sets = load_option_sets(records)
+    attempts = []
+    for record in records:
+        flags = [
+            selected is not None and selected == keys[question_id]
+            for _, question_id, selected, _ in _entries(record, texts, option_sets)
+        ]
+        record.correct = np.packbits(np.array(flags, dtype=bool), bitorder='little').tobytes()
+        attempts.append(QuizAttempt(id=record.attempt_id, score=sum(flags)))
+    ArchivedAnswers.objects.bulk_update(records, ['correct'])
+    QuizAttempt.objects.bulk_update(attempts, ['score'])
@@ -0,0 +1,142 @@
+"""Async versions of the student quiz-taking endpoints.
+
+They mirror the views of the same name in quiz.views but use the async ORM,
+cache and session APIs, so one ASGI worker can hold many students' requests
+open at once. Everything except those calls is shared with quiz.views.
+quiz.urls routes to them when settings.QUIZ_ASYNC_VIEWS is on.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, redirect
+
+from . import bookmarks, progress
+from .decorators import role_required
+from .models import Profile, Quiz, User
+from .views import (
+    _autosave_index, _bookmark_request, _bookmark_response, _clean_answers, _no_attempt, _post_json, _quiz_page,
+    _quiz_payload, _step, _submit_attempt, _submitted_redirect, _submitted_response,
+)
+
+# Submitting runs in a transaction, which the async ORM cannot span.
+asubmit_attempt = sync_to_async(_submit_attempt)
+
+
+async def _student(request):
+    """Return the resolved user with its profile attached."""
+    user = await request.auser()
+    # Templates and middleware read request.user; resolve it once, here.
+    request.user = user
+    # quiz.backends.ProfileBackend already joined the profile in.
+    if not User.profile.is_cached(user):
+        user.profile = await Profile.objects.aget(user=user)
+    return user
+
+
+async def _load(user, quiz_id, start=True):
+    """Return the quiz, the attempt and its questions; with ``start`` false the attempt may be None."""
+    quiz = await aget_object_or_404(Quiz, id=quiz_id)
+    if start:
+        state = await progress.aget_or_start(user, quiz)
+    else:
+        state = await progress.aget_live(user, quiz)
+        if state is None:
+            return quiz, None, []
+    selected_questions = await progress.aselected_questions(state, quiz)
+    return quiz, state, selected_questions
+
+
+@login_required
+@role_required('student')
+async def start_quiz(request, quiz_id):
+    user = await _student(request)
+    quiz, state, selected_questions = await _load(user, quiz_id)
+    if not selected_questions:
+        await progress.adiscard(state)
+        messages.error(request, "This quiz has no questions yet.")
+        return redirect('quiz_list')
+    answers = await progress.aload_answers(state)
+    current_index = min(state.current_index, len(selected_questions) - 1)
+
+    if request.method == 'POST':
+        selected_answer = request.POST.get('answer')
+        if selected_answer:
+            question_id = selected_questions[current_index].id
+            answers[question_id] = selected_answer
+            await progress.asave_answers(state, {question_id: selected_answer})
+
+        current_index = _step(request.POST.get('action'), current_index, len(selected_questions))
+        if current_index is None:
+            return _submitted_redirect(
+                request, await asubmit_attempt(user, quiz, state, selected_questions, answers)
+            )
+        await progress.asave_position(state, current_index=current_index)
+
+    bookmarked_questions = await bookmarks.abookmarked_ids(user, [selected_questions[current_index].id])
+    return _quiz_page(request, quiz, selected_questions, current_index, answers, bookmarked_questions)
+
+
+@login_required
+@role_required('student', "Only students can take quizzes.", json_status=403)
+async def quiz_api(request, quiz_id):
+    """Return the attempt's whole question set, without answer keys, in one payload."""
+    user = await _student(request)
+    quiz, state, selected_questions = await _load(user, quiz_id)
+    answers = await progress.aload_answers(state)
+    bookmarked = await bookmarks.abookmarked_ids(user, [question.id for question in selected_questions])
+    return _quiz_payload(quiz, state, selected_questions, answers, bookmarked)
+
+
+@login_required
+@role_required('student', json_status=400)
+async def quiz_api_autosave(request, quiz_id):
+    """Upsert a batch of answers and the current position without submitting."""
+    data, error = _post_json(request)
+    if error:
+        return error
+    quiz, state, selected_questions = await _load(await _student(request), quiz_id, start=False)
+    if state is None:
+        return _no_attempt()
+    answers = _clean_answers(data, selected_questions)
+    if answers:
+        await progress.asave_answers(state, answers)
+    current_index = _autosave_index(data, selected_questions)
+    if current_index is not None:
+        await progress.asave_position(state, current_index=current_index)
+    return JsonResponse({'status': 'success', 'saved': len(answers)})
+
+
+@login_required
+@role_required('student', json_status=400)
+async def quiz_api_submit(request, quiz_id):
+    """Grade a complete answer sheet in one request."""
+    data, error = _post_json(request)
+    if error:
+        return error
+    user = await _student(request)
+    quiz, state, selected_questions = await _load(user, quiz_id, start=False)
+    if state is None:
+        return _no_attempt()
+    if not selected_questions:
+        return JsonResponse({'status': 'error', 'message': 'This quiz has no questions yet.'}, status=400)
+    answers = await progress.aload_answers(state)
+    answers.update(_clean_answers(data, selected_questions))
+    return _submitted_response(await asubmit_attempt(user, quiz, state, selected_questions, answers))
+
+
+@login_required
+async def bookmark_question(request):
+    """Toggle one bookmark, or set it when the payload says ``bookmarked``."""
+    question_id, wanted = _bookmark_request(request)
+    if question_id is None:
+        return JsonResponse({'status': 'error'}, status=400)
+    user = await request.auser()
+    if wanted is None:
+        state = await bookmarks.atoggle(user, question_id)
+    elif wanted:
+        state = True if await bookmarks.aadd(user, [question_id]) else None
+    else:
+        await bookmarks.aremove(user, [question_id])
+        state = False
+    return _bookmark_response(question_id, state)
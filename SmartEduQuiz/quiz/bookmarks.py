@@ -0,0 +1,79 @@
+from .models import Bookmark, Question
+
+
+def clean_ids(values):
+    """Coerce question ids sent by clients (often strings) to a de-duplicated int list."""
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    ids = []
+    for value in values:
+        try:
+            question_id = int(value)
+        except (TypeError, ValueError):
+            continue
+        if question_id not in ids:
+            ids.append(question_id)
+    return ids
+
+
+def _rows(user, question_ids):
+    return [Bookmark(user=user, question_id=question_id) for question_id in question_ids]
+
+
+def _existing(question_ids):
+    return Question.objects.filter(id__in=question_ids).values_list('id', flat=True)
+
+
+def bookmarked_ids(user, question_ids=None):
+    """Return the set of ``question_ids`` (default: all) that ``user`` has bookmarked."""
+    bookmarks = Bookmark.objects.filter(user=user)
+    if question_ids is not None:
+        bookmarks = bookmarks.filter(question_id__in=question_ids)
+    return set(bookmarks.values_list('question_id', flat=True))
+
+
+def add(user, question_ids):
+    """Bookmark ``question_ids`` with one INSERT; already-bookmarked ones are left alone.
+
+    Ids that are not questions are dropped. Returns the ids that were kept.
+    """
+    question_ids = list(_existing(question_ids))
+    Bookmark.objects.bulk_create(_rows(user, question_ids), ignore_conflicts=True)
+    return question_ids
+
+
+def remove(user, question_ids):
+    return Bookmark.objects.filter(user=user, question_id__in=question_ids).delete()[0]
+
+
+def toggle(user, question_id):
+    """Flip one bookmark: a DELETE, or failing that an INSERT.
+
+    Returns the new state, or None when the question does not exist.
+    """
+    if remove(user, [question_id]):
+        return False
+    return True if add(user, [question_id]) else None
+
+
+async def abookmarked_ids(user, question_ids=None):
+    bookmarks = Bookmark.objects.filter(user=user)
+    if question_ids is not None:
+        bookmarks = bookmarks.filter(question_id__in=question_ids)
+    return {question_id async for question_id in bookmarks.values_list('question_id', flat=True)}
+
+
+async def aadd(user, question_ids):
+    question_ids = [question_id async for question_id in _existing(question_ids)]
+    await Bookmark.objects.abulk_create(_rows(user, question_ids), ignore_conflicts=True)
+    return question_ids
+
+
+async def aremove(user, question_ids):
+    return (await Bookmark.objects.filter(user=user, question_id__in=question_ids).adelete())[0]
+
+
+async def atoggle(user, question_id):
+    if await aremove(user, [question_id]):
+        return False
+    return True if await aadd(user, [question_id]) else None
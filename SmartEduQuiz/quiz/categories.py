@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Category
+
+CHECK_INTERVAL = getattr(settings, 'QUIZ_CATEGORY_CHECK_INTERVAL', 5)
+
+# Process-local copy of the category table, the stamp it was loaded at and
+# when that stamp was last compared with the database.
+_registry = {'stamp': None, 'checked_at': None, 'categories': (), 'by_id': {}}
+
+
+def invalidate():
+    """Make this process re-check the category table on next use.
+
+    Other processes notice the change within CHECK_INTERVAL seconds.
+    """
+    global _registry
+    _registry = {**_registry, 'checked_at': None}
+
+
+def _stamp():
+    # Changes with every insert (count, last id), delete (count) and save (updated_at).
+    return tuple(Category.objects.aggregate(count=Count('id'), last_id=Max('id'), changed=Max('updated_at')).values())
+
+
+def _current():
+    global _registry
+    registry = _registry
+    now = time.monotonic()
+    if registry['checked_at'] is not None and now - registry['checked_at'] < CHECK_INTERVAL:
+        return registry
+    stamp = _stamp()
+    if stamp != registry['stamp']:
+        # Read after the stamp, so the list is never older than the stamp it is stored with.
+        categories = tuple(Category.objects.order_by('id'))
+        registry = {
+            'stamp': stamp,
+            'categories': categories,
+            'by_id': {category.id: category for category in categories},
+        }
+    # Replace the whole dict so concurrent readers never see a half-built registry.
+    _registry = {**registry, 'checked_at': now}
+    return _registry
+
+
+def all_categories():
+    """Return every category, in creation order, querying at most once per CHECK_INTERVAL."""
+    return _current()['categories']
+
+
+def get_category(category_id):
+    """Return the category with ``category_id``, or None."""
+    return _current()['by_id'].get(category_id)
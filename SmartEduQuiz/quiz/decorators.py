@@ -0,0 +1,67 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from .models import Profile
+
+# The role is copied into the session at login (see quiz.signals), so gating a
+# view costs no query. A changed role takes effect at the next login.
+ROLE_SESSION_KEY = '_quiz_role'
+
+
+def get_role(request):
+    """Return the role of the logged-in user, or None if they have no profile."""
+    role = request.session.get(ROLE_SESSION_KEY)
+    if role is None:
+        try:
+            role = request.user.profile.role
+        except Profile.DoesNotExist:
+            return None
+        request.session[ROLE_SESSION_KEY] = role
+    return role
+
+
+async def aget_role(request):
+    role = await request.session.aget(ROLE_SESSION_KEY)
+    if role is None:
+        user = await request.auser()
+        role = await Profile.objects.filter(user_id=user.id).values_list('role', flat=True).afirst()
+        if role is None:
+            return None
+        await request.session.aset(ROLE_SESSION_KEY, role)
+    return role
+
+
+def role_required(role, message=None, json_status=None):
+    """Let only users with ``role`` through; use below ``login_required``.
+
+    Others are redirected to the dashboard with ``message``, or get a JSON
+    error with ``json_status`` when it is given.
+    """
+    def reject(request):
+        if json_status:
+            body = {'status': 'error'}
+            if message:
+                body['message'] = message
+            return JsonResponse(body, status=json_status)
+        if message:
+            messages.error(request, message)
+        return redirect('dashboard')
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            async def _view(request, *args, **kwargs):
+                if await aget_role(request) != role:
+                    return reject(request)
+                return await view_func(request, *args, **kwargs)
+        else:
+            def _view(request, *args, **kwargs):
+                if get_role(request) != role:
+                    return reject(request)
+                return view_func(request, *args, **kwargs)
+        return wraps(view_func)(_view)
+
+    return decorator
@@ -0,0 +1,148 @@
+import csv
+import itertools
+import json
+
+from django.utils.dateparse import parse_date
+
+from . import archive
+from .models import ArchivedAnswers, ArchivedOptions, Question, QuizAttempt, UserAnswer
+
+EXPORT_CHUNK_SIZE = 2000
+LINES_PER_WRITE = 500
+KINDS = ('attempts', 'answers')
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+ATTEMPT_COLUMNS = (
+    ('attempt_id', 'id'),
+    ('username', 'user__username'),
+    ('student_name', 'user__first_name'),
+    ('class_section', 'user__profile__class_section'),
+    ('quiz_id', 'quiz_id'),
+    ('quiz_title', 'quiz__title'),
+    ('category', 'quiz__category__name'),
+    ('score', 'score'),
+    ('total_questions', 'total_questions'),
+    ('completed_at', 'completed_at'),
+)
+ANSWER_COLUMNS = (
+    ('attempt_id', 'attempt_id'),
+    ('username', 'attempt__user__username'),
+    ('class_section', 'attempt__user__profile__class_section'),
+    ('quiz_id', 'attempt__quiz_id'),
+    ('question_id', 'question_id'),
+    ('question_text', 'question__text'),
+    ('selected_answer', 'selected_answer'),
+    ('is_correct', 'is_correct'),
+    ('completed_at', 'attempt__completed_at'),
+)
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _date(value, name):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+    return date
+
+
+def attempt_filters(params, prefix=''):
+    """Turn quiz/category/class_section/start/end query parameters into ORM lookups.
+
+    ``prefix`` points the lookups at the attempt from another model, e.g. 'attempt__'.
+    Raises ValueError for malformed values.
+    """
+    filters = {}
+    if params.get('quiz'):
+        filters[f'{prefix}quiz_id'] = _int(params['quiz'], 'quiz')
+    if params.get('category'):
+        filters[f'{prefix}quiz__category_id'] = _int(params['category'], 'category')
+    if params.get('class_section'):
+        filters[f'{prefix}user__profile__class_section'] = params['class_section']
+    if params.get('start'):
+        filters[f'{prefix}completed_at__date__gte'] = _date(params['start'], 'start')
+    if params.get('end'):
+        filters[f'{prefix}completed_at__date__lte'] = _date(params['end'], 'end')
+    return filters
+
+
+def _archived_answer_rows(params, chunk_size):
+    """Unpack archived answers into ANSWER_COLUMNS tuples, loading each quiz's questions once."""
+    records = ArchivedAnswers.objects.filter(**attempt_filters(params, 'attempt__')).order_by('attempt_id').values_list(
+        'attempt_id', 'attempt__user__username', 'attempt__user__profile__class_section', 'attempt__quiz_id',
+        'attempt__completed_at', 'question_ids', 'options', 'option_sets', 'correct', 'other_answers', named=True,
+    )
+    banks = {}
+    for record in records.iterator(chunk_size=chunk_size):
+        quiz_id = record.attempt__quiz_id
+        if quiz_id not in banks:
+            rows = Question.objects.filter(quiz_id=quiz_id).values_list('id', 'text', *archive.OPTION_COLUMNS)
+            banks[quiz_id] = (
+                {question_id: text for question_id, text, *_ in rows},
+                {question_id: options for question_id, _, *options in rows},
+                dict(ArchivedOptions.objects.filter(question__quiz_id=quiz_id).values_list('id', 'options')),
+            )
+        texts, options, option_sets = banks[quiz_id]
+        for question_id, selected, is_correct in archive.selections(record, options, option_sets):
+            yield (
+                record.attempt_id, record.attempt__user__username, record.attempt__user__profile__class_section,
+                quiz_id, question_id, texts[question_id], selected, is_correct, record.attempt__completed_at,
+            )
+
+
+def export_rows(kind, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return the column names and a lazy iterator of value tuples for an export.
+
+    Answer exports list archived attempts' answers first, then the live rows.
+    """
+    if kind == 'attempts':
+        columns = ATTEMPT_COLUMNS
+        queryset = QuizAttempt.objects.filter(**attempt_filters(params))
+    else:
+        columns = ANSWER_COLUMNS
+        queryset = UserAnswer.objects.filter(**attempt_filters(params, 'attempt__'))
+    names = [name for name, _ in columns]
+    rows = queryset.order_by('id').values_list(*(path for _, path in columns)).iterator(chunk_size=chunk_size)
+    if kind == 'answers':
+        rows = itertools.chain(_archived_answer_rows(params, chunk_size), rows)
+    return names, rows
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(names, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=str) + '\n'
+
+
+LINE_WRITERS = {'csv': _csv_lines, 'jsonl': _jsonl_lines}
+
+
+def stream(fmt, names, rows):
+    """Yield the export as text chunks of LINES_PER_WRITE lines, for StreamingHttpResponse."""
+    chunk = []
+    for line in LINE_WRITERS[fmt](names, rows):
+        chunk.append(line)
+        if len(chunk) >= LINES_PER_WRITE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,112 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import archive, item_analysis
+from .aggregates import record_attempt, refresh_student_totals
+from .analytics import invalidate_snapshot
+from .models import Question, QuizAttempt, UserAnswer
+
+ANSWER_BATCH_SIZE = 500
+
+
+def grade_answers(questions, answers):
+    """Score ``answers`` (a mapping of question id to selected text) in one pass.
+
+    Returns the score and the unsaved UserAnswer rows, in question order.
+    """
+    answers = {int(question_id): text for question_id, text in answers.items()}
+    score = 0
+    rows = []
+    for question in questions:
+        selected = answers.get(question.id) or ''
+        is_correct = selected == question.correct_answer
+        score += is_correct
+        rows.append(UserAnswer(question_id=question.id, selected_answer=selected, is_correct=is_correct))
+    return score, rows
+
+
+def grade_submission(user, quiz, questions, answers, class_section=None, batch_size=ANSWER_BATCH_SIZE):
+    """Grade and persist a finished quiz in a single transaction.
+
+    One INSERT for the attempt, batched INSERTs for its answers and the
+    totals update all commit together.
+    """
+    score, rows = grade_answers(questions, answers)
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            user=user,
+            quiz=quiz,
+            score=score,
+            total_questions=len(rows)
+        )
+        for row in rows:
+            row.attempt = attempt
+        UserAnswer.objects.bulk_create(rows, batch_size=batch_size)
+        record_attempt(attempt, quiz.category_id, class_section)
+    return attempt
+
+
+@transaction.atomic
+def regrade_attempts(attempts):
+    """Re-mark stored answers against the current answer key and refresh the scores."""
+    attempt_ids = attempts.values('id')
+    UserAnswer.objects.filter(attempt_id__in=attempt_ids).update(
+        is_correct=Exists(Question.objects.filter(
+            id=OuterRef('question_id'), correct_answer=OuterRef('selected_answer')
+        ))
+    )
+    QuizAttempt.objects.filter(id__in=attempt_ids, archived_answers__isnull=True).update(
+        score=Coalesce(Subquery(
+            UserAnswer.objects.filter(attempt_id=OuterRef('id'), is_correct=True)
+            .values('attempt_id').annotate(correct=Count('id')).values('correct')
+        ), 0)
+    )
+    archive.regrade(attempt_ids)
+    refresh_student_totals(
+        QuizAttempt.objects.filter(id__in=attempt_ids).values_list('user_id', flat=True).distinct()
+    )
+    for quiz_id in QuizAttempt.objects.filter(id__in=attempt_ids).values_list('quiz_id', flat=True).distinct():
+        item_analysis.reset(quiz_id)
+    transaction.on_commit(invalidate_snapshot)
+    return attempts.count()
+
+
+def _release_related(attempt_ids):
+    """Apply each relation's on_delete to the rows that point at ``attempt_ids``, one statement per model."""
+    for relation in QuizAttempt._meta.related_objects:
+        name = relation.field.name
+        rows = relation.related_model._base_manager.filter(**{f'{name}__in': attempt_ids})
+        if relation.many_to_many:
+            raise ImproperlyConfigured(f"delete_attempts does not clear {relation.related_model.__name__}.{name}")
+        if relation.on_delete is models.CASCADE:
+            rows.delete()
+        elif relation.on_delete is models.SET_NULL:
+            rows.update(**{name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            raise ImproperlyConfigured(
+                f"delete_attempts does not apply {relation.on_delete.__name__} for "
+                f"{relation.related_model.__name__}.{name}"
+            )
+
+
+@transaction.atomic
+def delete_attempts(attempts):
+    """Delete attempts and the rows that depend on them in a few statements and refresh what they fed."""
+    rows = list(attempts.values_list('id', 'user_id', 'quiz_id'))
+    attempt_ids = [attempt_id for attempt_id, _, _ in rows]
+    _release_related(attempt_ids)
+    if not rows:
+        return 0
+    # One plain DELETE rather than QuerySet.delete(), which would load each
+    # attempt to send its post_delete signal; the totals, item statistics and
+    # snapshot those signals maintain are refreshed below.
+    table = connection.ops.quote_name(QuizAttempt._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(attempt_ids))})", attempt_ids)
+    refresh_student_totals({user_id for _, user_id, _ in rows})
+    for quiz_id in {quiz_id for _, _, quiz_id in rows}:
+        item_analysis.reset(quiz_id)
+    transaction.on_commit(invalidate_snapshot)
+    return len(rows)
@@ -0,0 +1,157 @@
+import codecs
+import csv
+import json
+from itertools import chain
+
+from .models import Question
+from .question_bank import bump_bank_version
+
+QUESTION_FIELDS = ('text', 'option1', 'option2', 'option3', 'option4', 'correct_answer')
+FORMATS = ('pipe', 'csv', 'jsonl')
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_LINES = 5
+
+
+class ImportReport:
+    """Counts of what an import created and skipped, grouped by skip reason."""
+
+    def __init__(self, noun='questions'):
+        self.noun = noun
+        self.created = 0
+        self.skipped = 0
+        self.reasons = {}
+
+    def skip(self, line_no, reason):
+        self.skipped += 1
+        lines = self.reasons.setdefault(str(reason), [0, []])
+        lines[0] += 1
+        if len(lines[1]) < MAX_REPORTED_LINES:
+            lines[1].append(line_no)
+
+    def summary(self):
+        text = f"Imported {self.created} {self.noun}"
+        if self.skipped:
+            groups = []
+            for reason, (count, line_nos) in self.reasons.items():
+                sample = ', '.join(str(line_no) for line_no in line_nos)
+                more = ', ...' if count > len(line_nos) else ''
+                groups.append(f"{count} x {reason} (lines {sample}{more})")
+            text += f", skipped {self.skipped} invalid lines: " + '; '.join(groups)
+        return text + '.'
+
+
+def _pipe_rows(lines):
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield line_no, line.split('|')
+
+
+def _csv_rows(lines):
+    reader = csv.reader(lines)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [cell.strip().lower() for cell in first]
+    if set(QUESTION_FIELDS) <= set(header):
+        positions = [header.index(field) for field in QUESTION_FIELDS]
+        rows = reader
+    else:
+        positions = None
+        rows = chain([first], reader)
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        if positions is not None:
+            row = [row[i] if i < len(row) else '' for i in positions]
+        yield reader.line_num, row
+
+
+def _jsonl_rows(lines):
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        if isinstance(data, dict):
+            # A null or missing field is empty; numbers and the like are rejected by _validate().
+            yield line_no, [data.get(field) or '' for field in QUESTION_FIELDS]
+        elif isinstance(data, list):
+            yield line_no, data
+        else:
+            yield line_no, None
+
+
+PARSERS = {'pipe': _pipe_rows, 'csv': _csv_rows, 'jsonl': _jsonl_rows}
+
+
+def _validate(parts):
+    """Return the cleaned field dict for a row, or raise ValueError."""
+    if parts is None:
+        raise ValueError("not valid JSON")
+    if len(parts) != len(QUESTION_FIELDS):
+        raise ValueError(f"expected {len(QUESTION_FIELDS)} fields, got {len(parts)}")
+    not_text = [name for name, part in zip(QUESTION_FIELDS, parts) if not isinstance(part, str)]
+    if not_text:
+        raise ValueError(f"{', '.join(not_text)} must be text")
+    fields = dict(zip(QUESTION_FIELDS, (part.strip() for part in parts)))
+    missing = [name for name, value in fields.items() if not value]
+    if missing:
+        raise ValueError(f"empty {', '.join(missing)}")
+    options = [fields[f'option{i}'] for i in range(1, 5)]
+    for name in ('option1', 'option2', 'option3', 'option4', 'correct_answer'):
+        if len(fields[name]) > Question._meta.get_field(name).max_length:
+            raise ValueError(f"{name} is too long")
+    if fields['correct_answer'] not in options:
+        raise ValueError("correct answer is not one of the options")
+    return fields
+
+
+def guess_format(filename, default='pipe'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension, default)
+
+
+def decode_lines(chunks, encoding='utf-8-sig'):
+    """Lazily decode an iterable of byte lines, e.g. an UploadedFile."""
+    return codecs.iterdecode(chunks, encoding)
+
+
+def import_questions(quiz, lines, fmt='pipe', batch_size=IMPORT_BATCH_SIZE):
+    """Stream question rows from ``lines`` into ``quiz`` and return an ImportReport.
+
+    Rows are validated as they are read and inserted ``batch_size`` at a time;
+    only the question texts are kept, to skip a row whose text is already in
+    the quiz or earlier in the input, so importing a file twice adds nothing.
+    """
+    if fmt not in PARSERS:
+        raise ValueError(f"Unknown question format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    report = ImportReport()
+    texts = set(quiz.questions.values_list('text', flat=True))
+    batch = []
+    for line_no, parts in PARSERS[fmt](lines):
+        try:
+            fields = _validate(parts)
+        except ValueError as exc:
+            report.skip(line_no, exc)
+            continue
+        if fields['text'] in texts:
+            report.skip(line_no, "duplicate question")
+            continue
+        texts.add(fields['text'])
+        batch.append(Question(quiz=quiz, **fields))
+        if len(batch) >= batch_size:
+            Question.objects.bulk_create(batch)
+            report.created += len(batch)
+            batch = []
+    if batch:
+        Question.objects.bulk_create(batch)
+        report.created += len(batch)
+    if report.created:
+        # bulk_create skips the post_save signal that normally does this.
+        bump_bank_version(quiz.id)
+    return report
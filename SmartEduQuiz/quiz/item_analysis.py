@@ -0,0 +1,192 @@
+"""Classical item analysis: difficulty, point-biserial discrimination and distractors.
+
+Graded answers are folded into per-question running sums (QuestionStats) a
+chunk of attempts at a time, as NumPy bincounts over the answers. Only
+attempts newer than the quiz's watermark are read, so repeated reports cost
+one small update rather than a pass over every answer.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Value, When
+
+from . import adaptive, archive, question_bank
+from .models import ArchivedAnswers, ItemAnalysisWatermark, QuestionStats, Quiz, QuizAttempt, UserAnswer
+
+ITEM_CHUNK_ATTEMPTS = 2000
+OPTION_FIELDS = ('option1_count', 'option2_count', 'option3_count', 'option4_count', 'other_count')
+SUM_FIELDS = ('responses', 'correct', 'score_sum', 'score_sq_sum', 'correct_score_sum') + OPTION_FIELDS
+FLOAT_FIELDS = {'score_sum', 'score_sq_sum', 'correct_score_sum'}
+
+# Which option (0-3) an answer picked, or 4 when it matches none of them.
+OPTION_INDEX = Case(
+    *[When(selected_answer=F(f'question__option{i}'), then=Value(i - 1)) for i in range(1, 5)],
+    default=Value(4),
+    output_field=IntegerField(),
+)
+
+
+def reset(quiz_id):
+    """Forget a quiz's item statistics so the next update rebuilds them from scratch."""
+    ItemAnalysisWatermark.objects.filter(quiz_id=quiz_id).delete()
+    QuestionStats.objects.filter(question__quiz_id=quiz_id).delete()
+    adaptive.invalidate(quiz_id)
+
+
+def _chunk_sums(columns, attempts, answers):
+    """Return the SUM_FIELDS x question sums for one chunk of attempts.
+
+    ``attempts`` is an (A, 3) array of attempt id, score and question count in
+    id order; ``answers`` an (N, 4) array of attempt id, question id,
+    correctness and option index.
+    """
+    question_count = len(columns)
+    rows = np.searchsorted(attempts[:, 0], answers[:, 0])
+    cols = np.searchsorted(columns, answers[:, 1])
+    # Answers to questions that have since left the bank are ignored.
+    known = (cols < question_count) & (columns[np.minimum(cols, question_count - 1)] == answers[:, 1])
+    rows, cols, answers = rows[known], cols[known], answers[known]
+
+    # Weighted counts per question column; memory follows the number of answers.
+    correct = answers[:, 2].astype(float)
+    scores = (attempts[:, 1] / attempts[:, 2])[rows]
+
+    sums = np.empty((len(SUM_FIELDS), question_count))
+    sums[0] = np.bincount(cols, minlength=question_count)
+    sums[1] = np.bincount(cols, weights=correct, minlength=question_count)
+    sums[2] = np.bincount(cols, weights=scores, minlength=question_count)
+    sums[3] = np.bincount(cols, weights=scores * scores, minlength=question_count)
+    sums[4] = np.bincount(cols, weights=scores * correct, minlength=question_count)
+    sums[5:] = np.bincount(cols * 5 + answers[:, 3], minlength=question_count * 5).reshape(question_count, 5).T
+    return sums
+
+
+def _attempt_chunks(quiz, since, upto, chunk_size):
+    attempts = QuizAttempt.objects.filter(
+        quiz=quiz, id__gt=since, id__lte=upto, total_questions__gt=0
+    ).order_by('id').values_list('id', 'score', 'total_questions')
+    chunk = []
+    for row in attempts.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield np.array(chunk, dtype=np.int64)
+            chunk = []
+    if chunk:
+        yield np.array(chunk, dtype=np.int64)
+
+
+def _answers(quiz, attempts):
+    """Live and archived answers of the chunk as (attempt id, question id, correct, option index) rows."""
+    first, last = attempts[0, 0], attempts[-1, 0]
+    rows = UserAnswer.objects.filter(
+        attempt__quiz=quiz, attempt_id__gte=first, attempt_id__lte=last
+    ).annotate(option=OPTION_INDEX).values_list('attempt_id', 'question_id', 'is_correct', 'option')
+    parts = [np.array(list(rows), dtype=np.int64).reshape(-1, 4)]
+    archived = ArchivedAnswers.objects.filter(
+        attempt__quiz=quiz, attempt_id__gte=first, attempt_id__lte=last
+    ).values_list('attempt_id', 'question_ids', 'options', 'correct')
+    for attempt_id, question_ids, options, correct in archived:
+        question_ids, codes, flags = archive.unpack(question_ids, options, correct)
+        parts.append(np.column_stack([
+            np.full(len(codes), attempt_id), question_ids, flags, np.minimum(codes, 4),
+        ]).astype(np.int64))
+    return np.concatenate(parts)
+
+
+def _apply(columns, totals):
+    touched = np.flatnonzero(totals[0])
+    question_ids = columns[touched].tolist()
+    existing = {stats.question_id: stats for stats in QuestionStats.objects.filter(question_id__in=question_ids)}
+    created = []
+    for column, question_id in zip(touched, question_ids):
+        stats = existing.get(question_id)
+        if stats is None:
+            stats = QuestionStats(question_id=question_id)
+            created.append(stats)
+        for field, value in zip(SUM_FIELDS, totals[:, column].tolist()):
+            setattr(stats, field, getattr(stats, field) + (value if field in FLOAT_FIELDS else int(value)))
+    QuestionStats.objects.bulk_update(existing.values(), SUM_FIELDS)
+    QuestionStats.objects.bulk_create(created)
+
+
+def update(quiz, chunk_size=ITEM_CHUNK_ATTEMPTS):
+    """Fold attempts newer than the quiz's watermark into its QuestionStats.
+
+    Returns the number of attempts added. When two processes update the same
+    quiz at once, only the first to commit applies its sums.
+    """
+    watermark, _ = ItemAnalysisWatermark.objects.get_or_create(quiz=quiz)
+    since = watermark.last_attempt_id
+    upto = QuizAttempt.objects.filter(quiz=quiz).aggregate(last=Max('id'))['last'] or 0
+    columns = np.array(question_bank.get_question_ids(quiz), dtype=np.int64)
+    if upto <= since or not len(columns):
+        return 0
+
+    totals = np.zeros((len(SUM_FIELDS), len(columns)))
+    added = 0
+    for attempts in _attempt_chunks(quiz, since, upto, chunk_size):
+        totals += _chunk_sums(columns, attempts, _answers(quiz, attempts))
+        added += len(attempts)
+
+    with transaction.atomic():
+        claimed = ItemAnalysisWatermark.objects.filter(
+            id=watermark.id, last_attempt_id=since
+        ).update(last_attempt_id=upto)
+        if claimed:
+            _apply(columns, totals)
+    return added if claimed else 0
+
+
+def update_since(attempt_id):
+    """Fold the attempts graded after ``attempt_id`` into their quizzes' statistics.
+
+    Run off the request path, by run_grader and update_item_analysis; with
+    adaptive selection on, each updated quiz's index is rebuilt too. Returns
+    the newest attempt id covered, to pass in on the next call.
+    """
+    last = QuizAttempt.objects.aggregate(last=Max('id'))['last'] or 0
+    quiz_ids = QuizAttempt.objects.filter(id__gt=attempt_id, id__lte=last).values_list('quiz_id', flat=True)
+    for quiz in Quiz.objects.filter(id__in=set(quiz_ids)).order_by('id'):
+        if update(quiz) and adaptive.enabled():
+            adaptive.refresh(quiz)
+    return last
+
+
+def analyse(quiz):
+    """Bring the quiz's statistics up to date and return one row per question.
+
+    Each row has the question, its response count, difficulty (proportion
+    correct), point-biserial discrimination (None when undefined) and
+    distractor counts for option1-option4 plus unmatched answers.
+    """
+    update(quiz)
+    questions = list(quiz.questions.order_by('id').select_related('stats'))
+    sums = np.array([
+        [getattr(question.stats, field) if hasattr(question, 'stats') else 0 for field in SUM_FIELDS]
+        for question in questions
+    ], dtype=float).reshape(-1, len(SUM_FIELDS))
+    responses, correct, score_sum, score_sq_sum, correct_score_sum = sums[:, :5].T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difficulty = correct / responses
+        mean = score_sum / responses
+        sd = np.sqrt(np.maximum(score_sq_sum / responses - mean * mean, 0))
+        mean_correct = correct_score_sum / correct
+        mean_wrong = (score_sum - correct_score_sum) / (responses - correct)
+        discrimination = (mean_correct - mean_wrong) / sd * np.sqrt(difficulty * (1 - difficulty))
+
+    rows = []
+    for i, question in enumerate(questions):
+        options = [question.option1, question.option2, question.option3, question.option4]
+        counts = sums[i, 5:].astype(int).tolist()
+        rows.append({
+            'question': question,
+            'responses': int(responses[i]),
+            'difficulty': round(float(difficulty[i]), 3) if responses[i] else None,
+            'discrimination': round(float(discrimination[i]), 3) if np.isfinite(discrimination[i]) else None,
+            'distractors': [
+                {'option': option, 'count': count, 'is_correct': option == question.correct_answer}
+                for option, count in zip(options, counts)
+            ],
+            'other': counts[4],
+        })
+    return rows
@@ -0,0 +1,64 @@
+"""Student rankings by average score, read from the maintained StudentStats rows.
+
+Rankings never touch the attempt table. Ranks and board sizes come from
+ScoreBucket, a histogram of averages in 0.1-point bands that SQLite triggers
+keep in step with StudentStats. A rank sums the few hundred bands above the
+student's band and counts the students ahead of them inside their own band,
+so its cost does not grow with the rank or the size of the board.
+"""
+from django.db.models import F, IntegerField, Sum
+from django.db.models.functions import Cast
+
+from .models import ScoreBucket, StudentStats
+
+# Must match the bands written by the triggers in migration 0018.
+BUCKETS_PER_POINT = 10
+
+
+def _board(class_section=None):
+    # Rows are only created for students with an attempt, so no attempt_count
+    # filter; one would make the counts read every table row as well.
+    rows = StudentStats.objects.all()
+    if class_section:
+        rows = rows.filter(class_section=class_section)
+    return rows
+
+
+def _buckets(class_section=None):
+    return ScoreBucket.objects.filter(scope=class_section or '')
+
+
+def _students(buckets):
+    return buckets.aggregate(total=Sum('students'))['total'] or 0
+
+
+def rank_of(stats, class_section=None):
+    """Return the 1-based rank of ``stats`` among students with a higher average."""
+    if stats is None:
+        return None
+    # The same truncation as the triggers' CAST, so the band always agrees.
+    bucket = int(stats.average_score * BUCKETS_PER_POINT)
+    above = _students(_buckets(class_section).filter(bucket__gt=bucket))
+    # The upper bound keeps the index range to about one band; the cast makes it exact.
+    ahead = (
+        _board(class_section)
+        .alias(bucket=Cast(F('average_score') * BUCKETS_PER_POINT, IntegerField()))
+        .filter(
+            average_score__gt=stats.average_score,
+            average_score__lt=(bucket + 2) / BUCKETS_PER_POINT,
+            bucket=bucket,
+        )
+        .count()
+    )
+    return above + ahead + 1
+
+
+def board_size(class_section=None):
+    return _students(_buckets(class_section))
+
+
+def top_students(limit=3, class_section=None):
+    """Return the ``limit`` best StudentStats rows with their users joined in."""
+    return list(
+        _board(class_section).select_related('user').order_by('-average_score', 'user_id')[:limit]
+    )
@@ -0,0 +1,34 @@
+"""Fixtures and latency figures shared by the benchmark_* commands."""
+import uuid
+
+from quiz.models import Category, Profile, Question, Quiz, User
+
+
+def percentile(latencies, fraction):
+    """Return the ``fraction`` percentile of sorted ``latencies``, or 0 when there are none."""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] if latencies else 0
+
+
+def create_fixture(student_count, question_count, description):
+    """Create a throwaway teacher, category, quiz and students; return them for drop_fixture()."""
+    tag = uuid.uuid4().hex[:8]
+    teacher = User.objects.create(username=f'bench-teacher-{tag}')
+    category = Category.objects.create(name=f'Benchmark {tag}', description=description)
+    quiz = Quiz.objects.create(title=f'Benchmark {tag}', category=category, created_by=teacher)
+    Question.objects.bulk_create([
+        Question(quiz=quiz, text=f'Question {i}', option1='a', option2='b', option3='c',
+                 option4='d', correct_answer='a')
+        for i in range(question_count)
+    ])
+    students = User.objects.bulk_create([
+        User(username=f'bench-student-{tag}-{i}') for i in range(student_count)
+    ])
+    Profile.objects.bulk_create([Profile(user=student, role='student') for student in students])
+    return teacher, category, quiz, students
+
+
+def drop_fixture(teacher, category, quiz, students):
+    """Delete what create_fixture() made, attempts included."""
+    quiz.delete()
+    category.delete()
+    User.objects.filter(id__in=[teacher.id] + [student.id for student in students]).delete()
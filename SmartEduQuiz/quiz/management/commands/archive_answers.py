@@ -0,0 +1,50 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from quiz import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Pack the answer rows of attempts completed before a cutoff into one compact record per "
+        "attempt, or unpack them again with --restore. Results, exports and item analysis read "
+        "both forms. Run VACUUM afterwards to return the freed space to the filesystem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help=f"Cutoff age in days; archiving defaults to {archive.ARCHIVE_AFTER_DAYS}.")
+        parser.add_argument('--before', metavar='YYYY-MM-DD', help="Cutoff date, instead of --older-than.")
+        parser.add_argument('--restore', action='store_true',
+                            help="Unpack archived attempts before the cutoff (every one if no cutoff is given).")
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE,
+                            help="Attempts per transaction.")
+
+    def _cutoff(self, options):
+        if options['before']:
+            date = parse_date(options['before'])
+            if date is None:
+                raise CommandError("--before must be a date (YYYY-MM-DD).")
+            return timezone.make_aware(datetime.combine(date, time.min))
+        days = options['older_than']
+        if days is None and not options['restore']:
+            days = archive.ARCHIVE_AFTER_DAYS
+        return None if days is None else timezone.now() - timedelta(days=days)
+
+    def handle(self, *args, **options):
+        cutoff = self._cutoff(options)
+        total = 0
+        while True:
+            if options['restore']:
+                count = archive.restore_batch(cutoff, options['batch_size'])
+            else:
+                count = archive.archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            total += count
+            self.stdout.write(f"  {total} attempts")
+        verb = "Restored" if options['restore'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} the answers of {total} attempts."))
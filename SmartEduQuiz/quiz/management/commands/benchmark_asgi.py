@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from quiz.management.benchmarks import create_fixture, drop_fixture, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the WSGI and ASGI quiz-taking paths with many students taking a quiz at once: "
+        "each student loads the quiz, autosaves and submits. Run it against a scratch copy, e.g. "
+        "SMARTEDUQUIZ_DB_PATH=/tmp/bench.sqlite3 SMARTEDUQUIZ_DB_MODE=production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help="Concurrent simulated students.")
+        parser.add_argument('--wsgi-threads', type=int, default=64,
+                            help="Worker threads serving the WSGI path, like a threaded gunicorn pool.")
+        parser.add_argument('--questions', type=int, default=40)
+        parser.add_argument('--mode', choices=['both', 'wsgi', 'asgi'], default='both')
+        parser.add_argument('--keep', action='store_true', help="Keep the generated benchmark data.")
+
+    def _session(self, quiz, user):
+        latencies = []
+        client = Client()
+        client.force_login(user)
+        for method, url, payload in self._script(quiz):
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(url)
+            else:
+                response = client.post(url, data=payload, content_type='application/json')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                return latencies, 1
+        return latencies, 0
+
+    async def _asession(self, quiz, user):
+        latencies = []
+        client = AsyncClient()
+        await client.aforce_login(user)
+        for method, url, payload in self._script(quiz):
+            started = time.perf_counter()
+            if method == 'get':
+                response = await client.get(url)
+            else:
+                response = await client.post(url, data=payload, content_type='application/json')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                return latencies, 1
+        return latencies, 0
+
+    def _script(self, quiz):
+        answers = json.dumps({'answers': {}, 'current_index': 1})
+        return [
+            ('get', reverse('quiz_api', args=[quiz.id]), None),
+            ('post', reverse('quiz_api_autosave', args=[quiz.id]), answers),
+            ('post', reverse('quiz_api_submit', args=[quiz.id]), answers),
+        ]
+
+    @override_settings(ROOT_URLCONF='SmartEduQuiz1.sync_urls')
+    def _run_wsgi(self, quiz, users, threads):
+        with ThreadPoolExecutor(threads) as pool:
+            return list(pool.map(lambda user: self._session(quiz, user), users))
+
+    @override_settings(ROOT_URLCONF='SmartEduQuiz1.async_urls')
+    def _run_asgi(self, quiz, users):
+        async def burst():
+            return await asyncio.gather(*(self._asession(quiz, user) for user in users))
+
+        return asyncio.run(burst())
+
+    def _report(self, label, results, elapsed):
+        latencies = sorted(latency for batch, _ in results for latency in batch)
+        errors = sum(failed for _, failed in results)
+        self.stdout.write(
+            f"{label}: {len(latencies) / elapsed:8.1f} requests/s, "
+            f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms, {errors} failed students"
+        )
+
+    def handle(self, *args, **options):
+        fixture = create_fixture(options['students'], options['questions'], 'ASGI benchmark')
+        _, _, quiz, users = fixture
+        connections.close_all()
+        self.stdout.write(f"{len(users)} students, 3 requests each")
+        try:
+            if options['mode'] in ('both', 'wsgi'):
+                started = time.perf_counter()
+                results = self._run_wsgi(quiz, users, options['wsgi_threads'])
+                self._report(f"WSGI ({options['wsgi_threads']} threads)", results, time.perf_counter() - started)
+            if options['mode'] in ('both', 'asgi'):
+                started = time.perf_counter()
+                results = self._run_asgi(quiz, users)
+                self._report("ASGI (async views)", results, time.perf_counter() - started)
+        finally:
+            connections.close_all()
+            if not options['keep']:
+                drop_fixture(*fixture)
@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from quiz.grading import grade_submission
+from quiz.management.benchmarks import create_fixture, drop_fixture, percentile
+from quiz.models import Quiz, User
+
+
+def _init_worker():
+    django.setup()
+    # Never share the parent's SQLite handle across processes.
+    connections.close_all()
+
+
+def _submit_many(args):
+    """Grade ``count`` submissions as one student and return (latencies, lock errors)."""
+    user_id, quiz_id, count = args
+    user = User.objects.get(id=user_id)
+    quiz = Quiz.objects.get(id=quiz_id)
+    questions = list(quiz.questions.all())
+    answers = {question.id: question.option1 for question in questions}
+    latencies = []
+    errors = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            grade_submission(user, quiz, questions, answers, 'benchmark')
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connections.close_all()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how many quiz submissions per second the configured database sustains "
+        "with several processes writing at once. Run it against a scratch copy, e.g. "
+        "SMARTEDUQUIZ_DB_PATH=/tmp/bench.sqlite3 SMARTEDUQUIZ_DB_MODE=production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', default='1,2,4,8',
+                            help="Comma-separated numbers of concurrent submitting processes.")
+        parser.add_argument('--submissions', type=int, default=50, help="Submissions per process.")
+        parser.add_argument('--questions', type=int, default=30)
+        parser.add_argument('--keep', action='store_true', help="Keep the generated benchmark data.")
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['processes'].split(',')]
+        database = settings.DATABASES['default']
+        self.stdout.write(
+            f"Database {database['NAME']} (CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}, "
+            f"OPTIONS={database.get('OPTIONS', {})})"
+        )
+        fixture = create_fixture(max(levels), options['questions'], 'Write benchmark')
+        _, _, quiz, students = fixture
+        connections.close_all()
+        try:
+            for level in levels:
+                jobs = [(student.id, quiz.id, options['submissions']) for student in students[:level]]
+                with multiprocessing.Pool(level, initializer=_init_worker) as pool:
+                    started = time.perf_counter()
+                    results = pool.map(_submit_many, jobs)
+                    elapsed = time.perf_counter() - started
+                latencies = sorted(latency for batch, _ in results for latency in batch)
+                errors = sum(batch_errors for _, batch_errors in results)
+                self.stdout.write(
+                    f"{level:>3} processes: {len(latencies) / elapsed:8.1f} submissions/s, "
+                    f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms, "
+                    f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms, {errors} lock errors"
+                )
+        finally:
+            if not options['keep']:
+                drop_fixture(*fixture)
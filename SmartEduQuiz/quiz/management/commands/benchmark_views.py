@@ -0,0 +1,159 @@
+import json
+import platform
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from quiz import progress
+from quiz.management.benchmarks import percentile
+from quiz.models import InProgressAttempt, Quiz, QuizAttempt, User
+
+
+def _summary(samples):
+    latencies = sorted(latency for latency, _ in samples)
+    queries = [count for _, count in samples]
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0,
+        'queries': max(queries) if queries else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views end to end through the test client and report latency "
+        "percentiles and query counts per endpoint, saved as JSON so runs can be compared. "
+        "Submissions add attempts, so run it against a scratch copy filled by "
+        "generate_synthetic_data, e.g. SMARTEDUQUIZ_DB_PATH=/tmp/bench.sqlite3."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per endpoint first.")
+        parser.add_argument('--student', help="Username to benchmark as; defaults to the busiest student.")
+        parser.add_argument('--teacher', help="Username to benchmark as; defaults to the teacher with most quizzes.")
+        parser.add_argument('--output', help="Where to save the JSON results; defaults to a timestamped file.")
+        parser.add_argument('--compare', help="Earlier JSON results to print the change against.")
+        parser.add_argument('--label', default='', help="Free-form note stored with the results, e.g. a commit.")
+
+    def _user(self, username, role):
+        users = User.objects.filter(profile__role=role)
+        if username:
+            user = users.filter(username=username).first()
+        elif role == 'student':
+            user = users.annotate(attempts=Count('quizattempt')).order_by('-attempts').first()
+        else:
+            user = users.annotate(quizzes=Count('quiz')).order_by('-quizzes').first()
+        if user is None:
+            raise CommandError(f"No {role} to benchmark as; run generate_synthetic_data first.")
+        return user
+
+    def _time(self, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data=data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f"{method.upper()} {url} returned {response.status_code}")
+        return elapsed, len(ctx.captured_queries)
+
+    def _move_to(self, client, user, quiz, url, index):
+        """Start or resume the attempt and put it on question ``index`` (-1 for the last), untimed."""
+        self._time(client, 'get', url)
+        state = InProgressAttempt.objects.get(user=user, quiz=quiz)
+        if index < 0:
+            index += len(progress.selected_questions(state, quiz))
+        progress.save_position(state, current_index=index)
+
+    def _endpoints(self, student, teacher, quiz, attempt):
+        """Yield (name, run) pairs; each run() performs one request and returns (seconds, queries)."""
+        student_client = Client()
+        student_client.force_login(student)
+        teacher_client = Client()
+        teacher_client.force_login(teacher)
+        start_url = reverse('start_quiz', args=[quiz.id])
+
+        def step(action, index):
+            def run():
+                self._move_to(student_client, student, quiz, start_url, index)
+                return self._time(student_client, 'post', start_url, {'action': action, 'answer': 'x'})
+            return run
+
+        yield 'dashboard (student)', lambda: self._time(student_client, 'get', reverse('dashboard'))
+        yield 'dashboard (teacher)', lambda: self._time(teacher_client, 'get', reverse('dashboard'))
+        yield 'start_quiz', lambda: self._time(student_client, 'get', start_url)
+        yield 'start_quiz next', step('next', 0)
+        yield 'start_quiz previous', step('previous', 1)
+        # 'next' on the last question submits the attempt.
+        yield 'start_quiz submit', step('next', -1)
+        yield 'quiz_results', lambda: self._time(student_client, 'get', reverse('quiz_results', args=[attempt.id]))
+        yield 'quiz_list_category', lambda: self._time(
+            student_client, 'get', reverse('quiz_list_category', args=[quiz.category_id])
+        )
+
+    def _compare(self, path, results):
+        with open(path, encoding='utf-8') as handle:
+            earlier = json.load(handle)['endpoints']
+        self.stdout.write(f"\nChange against {path}:")
+        for name, now in results.items():
+            before = earlier.get(name)
+            if before is None:
+                continue
+            change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f"{name:22} p50 {before['p50_ms']:8.2f} -> {now['p50_ms']:8.2f} ms ({change:+6.1f}%), "
+                f"queries {before['queries']} -> {now['queries']}"
+            )
+
+    def handle(self, *args, **options):
+        student = self._user(options['student'], 'student')
+        teacher = self._user(options['teacher'], 'teacher')
+        quiz = Quiz.objects.filter(created_by=teacher).annotate(
+            question_count=Count('questions')
+        ).filter(question_count__gt=0).order_by('id').first()
+        if quiz is None:
+            raise CommandError(f"{teacher.username} has no quiz with questions.")
+        attempt = QuizAttempt.objects.filter(user=student).order_by('-id').first()
+        if attempt is None:
+            raise CommandError(f"{student.username} has no attempts to show results for.")
+
+        self.stdout.write(f"Student {student.username}, teacher {teacher.username}, quiz {quiz.id}")
+        results = {}
+        for name, run in self._endpoints(student, teacher, quiz, attempt):
+            for _ in range(options['warmup']):
+                run()
+            results[name] = _summary([run() for _ in range(options['iterations'])])
+            row = results[name]
+            self.stdout.write(
+                f"{name:22} p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  "
+                f"p99 {row['p99_ms']:8.2f} ms  {row['queries']:3} queries"
+            )
+
+        output = options['output'] or f"benchmark-views-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'label': options['label'],
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'data': {
+                    'students': User.objects.filter(profile__role='student').count(),
+                    'quizzes': Quiz.objects.count(),
+                    'attempts': QuizAttempt.objects.count(),
+                },
+                'endpoints': results,
+            }, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Saved {output}"))
+        if options['compare']:
+            self._compare(options['compare'], results)
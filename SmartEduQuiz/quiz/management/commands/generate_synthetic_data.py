@@ -0,0 +1,189 @@
+import math
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from quiz import categories
+from quiz.aggregates import rebuild_aggregates
+from quiz.analytics import invalidate_snapshot
+from quiz.models import Profile, Question, Quiz, QuizAttempt, User, UserAnswer
+from quiz.sampling import QUESTIONS_PER_ATTEMPT
+
+USERNAME_PREFIX = 'synthetic-'
+SECTION_LETTERS = 'ABCD'
+
+
+def _section_names(count):
+    """9A, 9B, 9C, 9D, 10A, ... for ``count`` class sections."""
+    return [f'{9 + i // len(SECTION_LETTERS)}{SECTION_LETTERS[i % len(SECTION_LETTERS)]}' for i in range(count)]
+
+
+def _p_correct(ability, difficulty):
+    return 1 / (1 + math.exp(difficulty - ability))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic students, quizzes, questions and graded attempts "
+        "through bulk inserts, for benchmarking. Run it against a scratch copy, e.g. "
+        "SMARTEDUQUIZ_DB_PATH=/tmp/bench.sqlite3 SMARTEDUQUIZ_DB_MODE=production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--sections', type=int, default=8, help="Class sections the students are spread over.")
+        parser.add_argument('--teachers', type=int, default=5)
+        parser.add_argument('--quizzes', type=int, default=4, help="Quizzes per category.")
+        parser.add_argument('--questions', type=int, default=40, help="Questions per quiz.")
+        parser.add_argument('--attempts', type=int, default=10000, help="Graded attempts, each with its answers.")
+        parser.add_argument('--days', type=float, default=730,
+                            help="Spread completion times evenly over this many days up to now; the default "
+                                 "leaves about half the attempts old enough for archive_answers.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Attempts inserted per transaction.")
+        parser.add_argument('--password', help="Password for every generated account; unusable if omitted.")
+        parser.add_argument('--seed', type=int, help="Random seed, for a reproducible data set.")
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete previously generated synthetic data instead of adding more.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            rebuild_aggregates()
+            invalidate_snapshot()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} synthetic rows."))
+            return
+
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:8]
+        password = make_password(options['password'])
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            teachers, students = self._users(rng, tag, password, options)
+            questions = self._quizzes(rng, tag, teachers, options)
+        self.stdout.write(
+            f"{len(students)} students, {len(teachers)} teachers, {len(questions)} quizzes "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        answers = self._attempts(rng, students, questions, options)
+        rebuild_aggregates()
+        invalidate_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['attempts']} attempts with {answers} answers; "
+            f"{time.perf_counter() - started:.2f}s in total (tag {tag})."
+        ))
+
+    def _users(self, rng, tag, password, options):
+        sections = _section_names(max(1, options['sections']))
+        category_list = categories.all_categories()
+        teachers = User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{tag}-teacher{i}@example.com', first_name=f'Teacher {i}',
+                 password=password)
+            for i in range(options['teachers'])
+        ])
+        students = User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{tag}-student{i}@example.com', first_name=f'Student {i}',
+                 password=password)
+            for i in range(options['students'])
+        ])
+        Profile.objects.bulk_create(
+            [
+                Profile(user=teacher, role='teacher',
+                        department=category_list[i % len(category_list)].name if category_list else '')
+                for i, teacher in enumerate(teachers)
+            ] + [
+                Profile(user=student, role='student', class_section=rng.choice(sections))
+                for student in students
+            ],
+            batch_size=options['batch_size'],
+        )
+        # Abilities on the same logit scale as question difficulty.
+        return teachers, [(student, rng.gauss(0.5, 1.0)) for student in students]
+
+    def _quizzes(self, rng, tag, teachers, options):
+        """Create the quizzes and return {quiz: [(question, difficulty), ...]}."""
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'{category.name} quiz {i + 1} ({tag})', category=category,
+                 created_by=teachers[(n * options['quizzes'] + i) % len(teachers)])
+            for n, category in enumerate(categories.all_categories())
+            for i in range(options['quizzes'])
+        ])
+        created = Question.objects.bulk_create(
+            [
+                Question(quiz=quiz, text=f'{quiz.title}: question {i + 1}', option1=f'Answer {i}-1',
+                         option2=f'Answer {i}-2', option3=f'Answer {i}-3', option4=f'Answer {i}-4',
+                         correct_answer=f'Answer {i}-{rng.randint(1, 4)}')
+                for quiz in quizzes
+                for i in range(options['questions'])
+            ],
+            batch_size=options['batch_size'],
+        )
+        questions = {quiz: [] for quiz in quizzes}
+        for question in created:
+            questions[question.quiz].append((question, rng.gauss(0, 1.0)))
+        return questions
+
+    def _attempts(self, rng, students, questions, options):
+        """Insert graded attempts in batches and return the number of answers.
+
+        Completion times rise with the attempt ids, one random moment in each
+        equal slice of the --days span, as if the attempts had been graded live.
+        """
+        quizzes = [quiz for quiz, bank in questions.items() if bank]
+        if not students or not quizzes:
+            return 0
+        start = timezone.now() - timedelta(days=options['days'])
+        slot = timedelta(days=options['days']) / max(1, options['attempts'])
+        total = 0
+        remaining = options['attempts']
+        while remaining > 0:
+            count = min(remaining, options['batch_size'])
+            remaining -= count
+            plans = []
+            for _ in range(count):
+                user, ability = rng.choice(students)
+                quiz = rng.choice(quizzes)
+                bank = questions[quiz]
+                picked = rng.sample(bank, min(QUESTIONS_PER_ATTEMPT, len(bank)))
+                answers = []
+                for question, difficulty in picked:
+                    if rng.random() < _p_correct(ability, difficulty):
+                        answers.append((question, question.correct_answer, True))
+                    else:
+                        wrong = [
+                            option for option in (question.option1, question.option2, question.option3,
+                                                  question.option4)
+                            if option != question.correct_answer
+                        ]
+                        answers.append((question, rng.choice(wrong), False))
+                plans.append((user, quiz, answers))
+
+            with transaction.atomic():
+                attempts = QuizAttempt.objects.bulk_create([
+                    QuizAttempt(user=user, quiz=quiz, total_questions=len(answers),
+                                score=sum(correct for _, _, correct in answers))
+                    for user, quiz, answers in plans
+                ])
+                # completed_at is auto_now_add, so it can only be backdated after the insert.
+                done = options['attempts'] - remaining - count
+                for n, attempt in enumerate(attempts, done):
+                    attempt.completed_at = start + slot * (n + rng.random())
+                QuizAttempt.objects.bulk_update(attempts, ['completed_at'], batch_size=options['batch_size'])
+                rows = UserAnswer.objects.bulk_create(
+                    [
+                        UserAnswer(attempt=attempt, question=question, selected_answer=selected, is_correct=correct)
+                        for attempt, (_, _, answers) in zip(attempts, plans)
+                        for question, selected, correct in answers
+                    ],
+                    batch_size=options['batch_size'] * 10,
+                )
+            total += len(rows)
+            self.stdout.write(f"  {options['attempts'] - remaining} attempts")
+        return total
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from quiz import importers
+from quiz.models import Category, Quiz, User
+
+
+class Command(BaseCommand):
+    help = "Stream a question bank file (pipe-delimited, CSV or JSON Lines) into a quiz."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--quiz', type=int, help="Add the questions to this existing quiz id.")
+        parser.add_argument('--title', help="Create a new quiz with this title.")
+        parser.add_argument('--category', type=int, help="Category id for a new quiz.")
+        parser.add_argument('--created-by', help="Username of the teacher who owns a new quiz.")
+        parser.add_argument('--format', choices=importers.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=importers.IMPORT_BATCH_SIZE)
+
+    def _quiz(self, options):
+        if options['quiz']:
+            try:
+                return Quiz.objects.get(id=options['quiz'])
+            except Quiz.DoesNotExist:
+                raise CommandError(f"Quiz {options['quiz']} does not exist.")
+        if not (options['title'] and options['category'] and options['created_by']):
+            raise CommandError("Pass --quiz, or --title, --category and --created-by to create one.")
+        try:
+            return Quiz.objects.create(
+                title=options['title'],
+                category=Category.objects.get(id=options['category']),
+                created_by=User.objects.get(username=options['created_by']),
+            )
+        except (Category.DoesNotExist, User.DoesNotExist) as exc:
+            raise CommandError(str(exc))
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or importers.guess_format(options['path'])
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines, transaction.atomic():
+            quiz = self._quiz(options)
+            report = importers.import_questions(quiz, lines, fmt, options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(report.summary())
+        self.stdout.write(self.style.SUCCESS(
+            f"Quiz {quiz.id} ({quiz.title}): {report.created} questions in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from quiz import roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Create student accounts from a CSV roster with email, first_name, class_section "
+        "and password columns, hashing passwords on every core. With --queued, import the "
+        "rosters teachers upload from the dashboard instead; runs until interrupted unless "
+        "--once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--class-section', help="Section for rows that leave class_section blank.")
+        parser.add_argument('--batch-size', type=int, default=roster.ROSTER_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, help="Hashing processes; defaults to the number of cores.")
+        parser.add_argument('--queued', action='store_true', help="Import uploaded rosters instead of a file.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when no upload is queued.")
+        parser.add_argument('--once', action='store_true', help="With --queued, drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            return self._run_queue(options)
+        if not options['path']:
+            raise CommandError("Give a roster path, or --queued.")
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            report, timings = roster.import_roster(
+                lines, options['class_section'], options['batch_size'], options['workers']
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(report.summary())
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} students in {elapsed:.2f}s ({report.created / elapsed:.0f}/s; "
+            f"hashing {timings['hashing']:.2f}s, inserting {timings['inserting']:.2f}s)."
+        ))
+
+    def _run_queue(self, options):
+        total = 0
+        try:
+            while True:
+                job = roster.import_pending(options['workers'])
+                if job is not None:
+                    total += 1
+                    self.stdout.write(f"Roster {job.id} ({job.status}): {job.report}")
+                    continue
+                if options['once']:
+                    break
+                connections.close_all()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} uploaded rosters in total."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from quiz.progress import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete in-progress quiz attempts that have been abandoned past QUIZ_PROGRESS_TTL."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Removed {purge_expired()} abandoned quiz attempts."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from quiz.question_bank import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Print the question bank cache hit and miss counters."
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']:.2%}"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from quiz.aggregates import rebuild_aggregates
+from quiz.models import CategoryStats, StudentStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-student and per-category score totals from QuizAttempt history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuild_aggregates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {StudentStats.objects.count()} student and "
+            f"{CategoryStats.objects.count()} category totals."
+        ))
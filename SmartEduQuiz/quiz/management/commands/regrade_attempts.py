@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from quiz.grading import regrade_attempts
+from quiz.models import QuizAttempt
+
+
+class Command(BaseCommand):
+    help = "Re-mark stored answers against the current answer key and refresh scores and totals."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help="Only regrade attempts of this quiz id.")
+        parser.add_argument('--user', type=int, help="Only regrade attempts of this user id.")
+
+    def handle(self, *args, **options):
+        attempts = QuizAttempt.objects.all()
+        if options['quiz']:
+            attempts = attempts.filter(quiz_id=options['quiz'])
+        if options['user']:
+            attempts = attempts.filter(user_id=options['user'])
+        count = regrade_attempts(attempts)
+        self.stdout.write(self.style.SUCCESS(f"Regraded {count} attempts."))
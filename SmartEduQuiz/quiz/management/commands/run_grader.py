@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from quiz import adaptive, item_analysis
+from quiz.submissions import GRADER_BATCH_SIZE, grade_pending, requeue_processing
+
+
+class Command(BaseCommand):
+    help = (
+        "Grade quiz submissions queued while QUIZ_QUEUED_GRADING is on, and fold new attempts "
+        "into the adaptive selection weights while the queue is empty. "
+        "Runs until interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=GRADER_BATCH_SIZE,
+                            help="Submissions graded per transaction.")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--requeue', action='store_true',
+                            help="First put back submissions a stopped worker left processing. "
+                                 "Only safe when no other worker is running.")
+
+    def handle(self, *args, **options):
+        total = 0
+        folded = 0
+        if options['requeue']:
+            self.stdout.write(f"Requeued {requeue_processing()} submissions.")
+        try:
+            while True:
+                graded = grade_pending(options['batch_size'])
+                total += graded
+                if graded:
+                    self.stdout.write(f"Graded {graded} submissions.")
+                    continue
+                if adaptive.enabled():
+                    folded = item_analysis.update_since(folded)
+                if options['once']:
+                    break
+                connections.close_all()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Graded {total} submissions in total."))
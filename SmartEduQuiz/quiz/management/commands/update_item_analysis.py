@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz import adaptive, item_analysis
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Fold newly graded attempts into the per-question item analysis statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help="Only update this quiz id.")
+        parser.add_argument('--rebuild', action='store_true', help="Discard the stored sums and start over.")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('id')
+        if options['quiz']:
+            quizzes = quizzes.filter(id=options['quiz'])
+        started = time.perf_counter()
+        total = 0
+        for quiz in quizzes:
+            if options['rebuild']:
+                item_analysis.reset(quiz.id)
+            added = item_analysis.update(quiz)
+            if added and adaptive.enabled():
+                adaptive.refresh(quiz)
+            total += added
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Added {total} attempts in {elapsed:.2f}s."))
@@ -0,0 +1,155 @@
+"""Per-request SQL and template timing, reported in a Server-Timing header.
+
+Requests slower than QUIZ_SLOW_REQUEST_MS, or issuing more than
+QUIZ_SLOW_REQUEST_QUERIES queries, are also written as one JSON object per
+line to the 'quiz.slow_requests' logger. Queries are timed by an execute
+wrapper on the request thread's connections, templates by the
+TimedDjangoTemplates backend. With QUIZ_REQUEST_TIMING off the middleware
+removes itself from the stack and the backend renders untimed.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger('quiz.slow_requests')
+
+# Stats of the request being served; contextvars follow sync_to_async, so
+# queries run by async views are counted too.
+_current = ContextVar('quiz_request_timing', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db', 'template')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+
+
+def _record(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db += time.perf_counter() - started
+        stats.queries += 1
+
+
+def _wrap_connections():
+    """Time every query on this thread's connections until the returned stack is closed."""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(_record))
+    return stack
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding each response's render time to the request's stats.
+
+    Includes and extends are rendered inside the top-level template, so
+    timing the templates this backend hands out counts each render once.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _user_id(request):
+    """The user's id if the request already loaded them; never queries."""
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return getattr(user, 'pk', None)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = settings.QUIZ_SLOW_REQUEST_MS
+        self.slow_queries = settings.QUIZ_SLOW_REQUEST_QUERIES
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with _wrap_connections():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            # The ORM runs in the request's thread-sensitive thread, so wrap its connections there.
+            wrapped = await sync_to_async(_wrap_connections)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(wrapped.close)()
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, time.perf_counter() - started)
+
+    def _finish(self, request, response, stats, elapsed):
+        total_ms = elapsed * 1000
+        db_ms = stats.db * 1000
+        template_ms = stats.template * 1000
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+            f'template;dur={template_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        if total_ms >= self.slow_ms or stats.queries > self.slow_queries:
+            match = request.resolver_match
+            logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'user_id': _user_id(request),
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': stats.queries,
+                'template_ms': round(template_ms, 1),
+            }))
+        return response
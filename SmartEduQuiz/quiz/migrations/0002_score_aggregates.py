@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+    StudentStats = apps.get_model('quiz', 'StudentStats')
+    CategoryStats = apps.get_model('quiz', 'CategoryStats')
+    for model, group_by in ((StudentStats, ('user',)), (CategoryStats, ('user', 'quiz__category'))):
+        rows = QuizAttempt.objects.values(*group_by).annotate(
+            attempts=Count('id'), score=Sum('score'), questions=Sum('total_questions')
+        ).order_by()
+        model.objects.bulk_create([
+            model(
+                attempt_count=row['attempts'],
+                score_total=row['score'] or 0,
+                question_total=row['questions'] or 0,
+                **{field.split('__')[-1] + '_id': row[field] for field in group_by}
+            )
+            for row in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveIntegerField(default=0)),
+                ('question_total', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveIntegerField(default=0)),
+                ('question_total', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='unique_user_category_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:31
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+
+def backfill_rankings(apps, schema_editor):
+    StudentStats = apps.get_model('quiz', 'StudentStats')
+    Profile = apps.get_model('quiz', 'Profile')
+    StudentStats.objects.filter(attempt_count__gt=0).update(
+        average_score=Cast(F('score_total'), FloatField()) / F('attempt_count'),
+        class_section=Subquery(
+            Profile.objects.filter(user_id=OuterRef('user_id')).values('class_section')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_score_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentstats',
+            name='average_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='studentstats',
+            name='class_section',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['-average_score'], name='stats_average_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentstats',
+            index=models.Index(fields=['class_section', '-average_score'], name='stats_section_average_idx'),
+        ),
+        migrations.RunPython(backfill_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_leaderboard_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='bank_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
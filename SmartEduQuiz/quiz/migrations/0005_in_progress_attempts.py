@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_quiz_bank_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InProgressAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.PositiveBigIntegerField()),
+                ('bank_version', models.PositiveIntegerField()),
+                ('current_index', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InProgressAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selected_answer', models.CharField(max_length=200)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.question')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.inprogressattempt')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inprogressattempt',
+            index=models.Index(fields=['updated_at'], name='in_progress_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='inprogressattempt',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz'), name='unique_in_progress_attempt'),
+        ),
+        migrations.AddConstraint(
+            model_name='inprogressanswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='unique_in_progress_answer'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:02
+
+from django.db import migrations
+
+DEFAULT_CATEGORIES = [
+    {'name': 'Math', 'icon': '➕', 'description': 'Mathematics quizzes'},
+    {'name': 'Science', 'icon': '🔬', 'description': 'Science quizzes'},
+    {'name': 'History', 'icon': '📜', 'description': 'History quizzes'},
+    {'name': 'English', 'icon': '📜', 'description': 'English quizzes'},
+    {'name': 'Nepali', 'icon': '📜', 'description': 'Nepali quizzes'},
+]
+
+
+def seed_categories(apps, schema_editor):
+    Category = apps.get_model('quiz', 'Category')
+    existing = set(Category.objects.values_list('name', flat=True))
+    Category.objects.bulk_create([
+        Category(**category) for category in DEFAULT_CATEGORIES if category['name'] not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_bookmarks'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_seed_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemAnalysisWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_attempt_id', models.PositiveBigIntegerField(default=0)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_watermark', to='quiz.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('correct_score_sum', models.FloatField(default=0)),
+                ('option1_count', models.PositiveIntegerField(default=0)),
+                ('option2_count', models.PositiveIntegerField(default=0)),
+                ('option3_count', models.PositiveIntegerField(default=0)),
+                ('option4_count', models.PositiveIntegerField(default=0)),
+                ('other_count', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='quiz.question')),
+            ],
+        ),
+    ]
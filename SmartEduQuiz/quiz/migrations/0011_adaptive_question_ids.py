@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_item_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inprogressattempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_adaptive_question_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['completed_at'], name='attempt_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_attempt_completed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAnswers',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archived_answers', serialize=False, to='quiz.quizattempt')),
+                ('question_ids', models.BinaryField()),
+                ('options', models.BinaryField()),
+                ('correct', models.BinaryField()),
+                ('other_answers', models.JSONField(blank=True, default=dict)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
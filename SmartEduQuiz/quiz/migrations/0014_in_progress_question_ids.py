@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:14
+
+import random
+
+from django.db import migrations, models
+
+# quiz.sampling as of this migration: the selection a seed used to be replayed into.
+QUESTIONS_PER_ATTEMPT = 30
+
+
+def store_question_ids(apps, schema_editor):
+    InProgressAttempt = apps.get_model('quiz', 'InProgressAttempt')
+    Question = apps.get_model('quiz', 'Question')
+    banks = {}
+    pending = list(InProgressAttempt.objects.filter(question_ids__isnull=True))
+    for progress in pending:
+        if progress.quiz_id not in banks:
+            banks[progress.quiz_id] = list(
+                Question.objects.filter(quiz_id=progress.quiz_id).order_by('id').values_list('id', flat=True)
+            )
+        bank = banks[progress.quiz_id]
+        progress.question_ids = random.Random(progress.seed).sample(bank, min(QUESTIONS_PER_ATTEMPT, len(bank)))
+    InProgressAttempt.objects.bulk_update(pending, ['question_ids'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_archived_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(store_question_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='inprogressattempt',
+            name='bank_version',
+        ),
+        migrations.AlterField(
+            model_name='inprogressattempt',
+            name='question_ids',
+            field=models.JSONField(),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_roster_imports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedanswers',
+            name='option_sets',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOptions',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=32)),
+                ('options', models.JSONField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_options', to='quiz.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('question', 'digest'), name='unique_archived_options')],
+            },
+        ),
+    ]
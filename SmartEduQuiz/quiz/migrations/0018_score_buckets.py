@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+# quiz.leaderboard.BUCKETS_PER_POINT: each bucket spans 0.1 of an average score.
+BUCKET = 'CAST({row}.average_score * 10 AS INTEGER)'
+
+
+def _add(row, delta):
+    """Statements adding ``delta`` to the overall and section buckets of trigger row ``row``."""
+    bucket = BUCKET.format(row=row)
+    return (
+        f"INSERT INTO quiz_scorebucket (scope, bucket, students) VALUES ('', {bucket}, {delta}) "
+        f"ON CONFLICT (scope, bucket) DO UPDATE SET students = students + {delta}; "
+        f"INSERT INTO quiz_scorebucket (scope, bucket, students) "
+        f"SELECT {row}.class_section, {bucket}, {delta} WHERE COALESCE({row}.class_section, '') != '' "
+        f"ON CONFLICT (scope, bucket) DO UPDATE SET students = students + {delta};"
+    )
+
+
+TRIGGERS = [
+    ('score_bucket_insert', 'AFTER INSERT ON quiz_studentstats', _add('NEW', 1)),
+    ('score_bucket_delete', 'AFTER DELETE ON quiz_studentstats', _add('OLD', -1)),
+    ('score_bucket_update', 'AFTER UPDATE OF average_score, class_section ON quiz_studentstats',
+     _add('OLD', -1) + ' ' + _add('NEW', 1)),
+]
+
+BACKFILL = [
+    f"INSERT INTO quiz_scorebucket (scope, bucket, students) "
+    f"SELECT '', {BUCKET.format(row='quiz_studentstats')}, COUNT(*) FROM quiz_studentstats GROUP BY 2;",
+    f"INSERT INTO quiz_scorebucket (scope, bucket, students) "
+    f"SELECT class_section, {BUCKET.format(row='quiz_studentstats')}, COUNT(*) FROM quiz_studentstats "
+    f"WHERE COALESCE(class_section, '') != '' GROUP BY 1, 2;",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0017_archived_option_sets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(blank=True, max_length=50)),
+                ('bucket', models.IntegerField()),
+                ('students', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'bucket'), name='unique_score_bucket')],
+            },
+        ),
+        migrations.RunSQL(
+            [f'CREATE TRIGGER {name} {event} BEGIN {body} END;' for name, event, body in TRIGGERS] + BACKFILL,
+            [f'DROP TRIGGER {name};' for name, _, _ in TRIGGERS],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0018_score_buckets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingsubmission',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
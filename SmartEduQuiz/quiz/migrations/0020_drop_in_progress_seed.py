@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0019_pending_submission_processing'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='inprogressattempt',
+            name='seed',
+        ),
+    ]
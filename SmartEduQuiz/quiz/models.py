@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import User
 
@@ -16,6 +17,11 @@ class Profile(models.Model):
     class_section = models.CharField(max_length=50, blank=True, null=True)  # For students
     department = models.CharField(max_length=100, blank=True, null=True)  # For teachers
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['role', 'class_section'], name='profile_role_section_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
@@ -23,6 +29,8 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     icon = models.CharField(max_length=10, default="📚")
     description = models.TextField()
+    # Part of the stamp quiz.categories checks to notice edits made by other processes.
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -32,6 +40,8 @@ class Quiz(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever a question changes; keys the question bank cache.
+    bank_version = models.PositiveIntegerField(default=1, editable=False)
 
     def __str__(self):
         return self.title
@@ -55,6 +65,18 @@ class QuizAttempt(models.Model):
     total_questions = models.IntegerField(default=0)
     completed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Student dashboard: a student's attempts, newest first.
+            models.Index(fields=['user', '-completed_at'], name='attempt_user_recent_idx'),
+            # Per-student, per-quiz score group-bys, answered from the index alone.
+            models.Index(fields=['user', 'quiz', 'score'], name='attempt_user_quiz_score_idx'),
+            # Per-quiz and per-category score aggregates.
+            models.Index(fields=['quiz', 'score'], name='attempt_quiz_score_idx'),
+            # Admin date filters across every student.
+            models.Index(fields=['completed_at'], name='attempt_completed_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title}"
 
@@ -64,5 +86,242 @@ class UserAnswer(models.Model):
     selected_answer = models.CharField(max_length=200)
     is_correct = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['attempt', 'question'], name='answer_attempt_question_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.attempt.user.username} - {self.question.text}"
+
+
+class ArchivedAnswers(models.Model):
+    """Every UserAnswer of an old attempt packed into one row (see quiz.archive).
+
+    ``question_ids`` holds the question ids as little-endian uint32 in answer
+    order, ``options`` one byte per answer (the chosen option's index, or a
+    code for a blank or unmatched answer whose text is kept in
+    ``other_answers``), ``option_sets`` the ArchivedOptions id the index
+    refers to, as uint32 in the same order, and ``correct`` a bitmap of the
+    graded answers. Rows archived before option sets were kept have no
+    ``option_sets`` and read the questions' current options.
+    """
+    attempt = models.OneToOneField(
+        QuizAttempt, on_delete=models.CASCADE, primary_key=True, related_name='archived_answers'
+    )
+    question_ids = models.BinaryField()
+    options = models.BinaryField()
+    option_sets = models.BinaryField(default=b'', blank=True)
+    correct = models.BinaryField()
+    other_answers = models.JSONField(default=dict, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.attempt_id} ({len(self.options)} answers)"
+
+
+class ArchivedOptions(models.Model):
+    """A question's four option texts as they stood when answers to it were archived.
+
+    One row per distinct wording, found by a digest of the texts, so archived
+    answers keep the text they picked after the options are edited.
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='archived_options')
+    digest = models.CharField(max_length=32)
+    options = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'digest'], name='unique_archived_options'),
+        ]
+
+    def __str__(self):
+        return f"{self.question_id} ({self.digest})"
+
+class StudentStats(models.Model):
+    """Running score totals for one student, maintained as attempts are submitted."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+    question_total = models.PositiveIntegerField(default=0)
+    # Denormalised so the leaderboard can rank from a single index.
+    average_score = models.FloatField(default=0)
+    class_section = models.CharField(max_length=50, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-average_score'], name='stats_average_idx'),
+            models.Index(fields=['class_section', '-average_score'], name='stats_section_average_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.attempt_count} attempts"
+
+class ScoreBucket(models.Model):
+    """How many StudentStats rows have an average in one 0.1-point band, overall or in a section.
+
+    ``scope`` is '' for every student, else a class section. Maintained by
+    SQLite triggers on StudentStats (migration 0018), so every insert,
+    update and delete path keeps it exact; quiz.leaderboard ranks from it.
+    """
+    scope = models.CharField(max_length=50, blank=True)
+    bucket = models.IntegerField()
+    students = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'bucket'], name='unique_score_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope or 'all'} {self.bucket}: {self.students}"
+
+class CategoryStats(models.Model):
+    """Running score totals for one student within one category."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+    question_total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_user_category_stats'),
+        ]
+
+    @property
+    def average_score(self):
+        return self.score_total / self.attempt_count if self.attempt_count else 0
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category_id}"
+
+
+class InProgressAttempt(models.Model):
+    """Server-side state of a quiz a student has started but not submitted."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    # The ordered questions drawn at the start; later edits to the bank leave them be.
+    question_ids = models.JSONField()
+    current_index = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'quiz'], name='unique_in_progress_attempt'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at'], name='in_progress_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.quiz_id} (question {self.current_index + 1})"
+
+class InProgressAnswer(models.Model):
+    attempt = models.ForeignKey(InProgressAttempt, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    selected_answer = models.CharField(max_length=200)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='unique_in_progress_answer'),
+        ]
+
+    def __str__(self):
+        return f"{self.attempt_id} - {self.question_id}"
+
+class Bookmark(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookmarks')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='unique_bookmark'),
+        ]
+        indexes = [
+            # Bookmarked questions page: a student's bookmarks, newest first.
+            models.Index(fields=['user', '-created_at'], name='bookmark_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.question_id}"
+
+class QuestionStats(models.Model):
+    """Running sums over every graded response to a question, for item analysis.
+
+    Scores are attempt scores as a fraction of the attempt's question count.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    responses = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    option1_count = models.PositiveIntegerField(default=0)
+    option2_count = models.PositiveIntegerField(default=0)
+    option3_count = models.PositiveIntegerField(default=0)
+    option4_count = models.PositiveIntegerField(default=0)
+    other_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.question_id}: {self.correct}/{self.responses}"
+
+class ItemAnalysisWatermark(models.Model):
+    """The newest attempt of a quiz already folded into its QuestionStats."""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='item_watermark')
+    last_attempt_id = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.quiz_id} up to attempt {self.last_attempt_id}"
+
+class PendingSubmission(models.Model):
+    """A submitted answer sheet waiting for the run_grader worker."""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    question_ids = models.JSONField()
+    answers = models.JSONField()
+    class_section = models.CharField(max_length=50, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempt = models.OneToOneField(QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+    graded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='pending_submission_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.quiz_id} ({self.status})"
+
+class RosterImport(models.Model):
+    """An uploaded roster CSV waiting for ``import_roster --queued``."""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='roster_imports')
+    class_section = models.CharField(max_length=50, blank=True, null=True)
+    csv_text = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    report = models.TextField(blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='roster_import_queue_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.attempt.user.username} - {self.question.text}"
\ No newline at end of file
+        return f"{self.uploaded_by_id} roster ({self.status})"
@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import adaptive, question_bank, sampling
+from .models import InProgressAnswer, InProgressAttempt
+
+# Attempts untouched for this many seconds are treated as abandoned.
+PROGRESS_TTL = getattr(settings, 'QUIZ_PROGRESS_TTL', 60 * 60 * 24)
+PURGE_INTERVAL = getattr(settings, 'QUIZ_PROGRESS_PURGE_INTERVAL', 60 * 15)
+PURGE_KEY = 'quiz_progress:purged'
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=PROGRESS_TTL)
+
+
+def purge_expired():
+    """Delete abandoned in-progress attempts and return how many were removed."""
+    _, deleted = InProgressAttempt.objects.filter(updated_at__lt=_cutoff()).delete()
+    return deleted.get(InProgressAttempt._meta.label, 0)
+
+
+def get_live(user, quiz):
+    """Return the unexpired in-progress attempt of ``user`` on ``quiz``, or None."""
+    return InProgressAttempt.objects.filter(user=user, quiz=quiz, updated_at__gte=_cutoff()).first()
+
+
+def get_or_start(user, quiz):
+    """Return the live in-progress attempt of ``user`` on ``quiz``, starting one if needed.
+
+    A new attempt stores the ids of the questions it draws, so adding or
+    removing questions later does not change what an attempt under way shows.
+    """
+    progress = get_live(user, quiz)
+    if progress is None:
+        # The purge is a DELETE over the whole table; the first start per interval runs it.
+        if cache.add(PURGE_KEY, True, PURGE_INTERVAL):
+            purge_expired()
+        seed = sampling.new_seed()
+        if adaptive.enabled():
+            question_ids = adaptive.sample_question_ids(quiz, user, seed)
+        else:
+            question_ids = sampling.sample_question_ids(question_bank.get_question_ids(quiz), seed)
+        progress, _ = InProgressAttempt.objects.get_or_create(
+            user=user, quiz=quiz, defaults={'question_ids': question_ids}
+        )
+    return progress
+
+
+def selected_questions(progress, quiz):
+    """Return the ordered QuestionRecords of an attempt; questions deleted since are left out."""
+    return question_bank.get_questions(quiz, progress.question_ids)
+
+
+def load_answers(progress):
+    return dict(progress.answers.values_list('question_id', 'selected_answer'))
+
+
+def save_answers(progress, answers):
+    """Insert or overwrite answer rows from a mapping of question id to selected text."""
+    InProgressAnswer.objects.bulk_create(
+        [
+            InProgressAnswer(attempt=progress, question_id=question_id, selected_answer=selected_answer)
+            for question_id, selected_answer in answers.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['selected_answer'],
+    )
+
+
+def save_answer(progress, question_id, selected_answer):
+    save_answers(progress, {question_id: selected_answer})
+
+
+def save_position(progress, **changes):
+    """Persist ``changes`` (e.g. ``current_index``) on the attempt row and refresh its expiry."""
+    changes['updated_at'] = timezone.now()
+    InProgressAttempt.objects.filter(id=progress.id).update(**changes)
+    for field, value in changes.items():
+        setattr(progress, field, value)
+
+
+def discard(progress):
+    progress.delete()
+
+
+def claim(progress):
+    """Delete the attempt to submit it; False if another request already did.
+
+    Call inside the transaction that grades or queues it, so that exactly one
+    of several submissions of the same attempt goes through.
+    """
+    _, deleted = InProgressAttempt.objects.filter(id=progress.id).delete()
+    return bool(deleted.get(InProgressAttempt._meta.label))
+
+
+# Async counterparts used by quiz.async_views.
+
+async def apurge_expired():
+    _, deleted = await InProgressAttempt.objects.filter(updated_at__lt=_cutoff()).adelete()
+    return deleted.get(InProgressAttempt._meta.label, 0)
+
+
+async def aget_live(user, quiz):
+    return await InProgressAttempt.objects.filter(user=user, quiz=quiz, updated_at__gte=_cutoff()).afirst()
+
+
+async def aget_or_start(user, quiz):
+    progress = await aget_live(user, quiz)
+    if progress is None:
+        if await cache.aadd(PURGE_KEY, True, PURGE_INTERVAL):
+            await apurge_expired()
+        seed = sampling.new_seed()
+        if adaptive.enabled():
+            question_ids = await adaptive.asample_question_ids(quiz, user, seed)
+        else:
+            question_ids = sampling.sample_question_ids(await question_bank.aget_question_ids(quiz), seed)
+        progress, _ = await InProgressAttempt.objects.aget_or_create(
+            user=user, quiz=quiz, defaults={'question_ids': question_ids}
+        )
+    return progress
+
+
+async def aselected_questions(progress, quiz):
+    return await question_bank.aget_questions(quiz, progress.question_ids)
+
+
+async def aload_answers(progress):
+    return {
+        question_id: selected_answer
+        async for question_id, selected_answer in progress.answers.values_list('question_id', 'selected_answer')
+    }
+
+
+async def asave_answers(progress, answers):
+    await InProgressAnswer.objects.abulk_create(
+        [
+            InProgressAnswer(attempt=progress, question_id=question_id, selected_answer=selected_answer)
+            for question_id, selected_answer in answers.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['selected_answer'],
+    )
+
+
+async def asave_position(progress, **changes):
+    changes['updated_at'] = timezone.now()
+    await InProgressAttempt.objects.filter(id=progress.id).aupdate(**changes)
+    for field, value in changes.items():
+        setattr(progress, field, value)
+
+
+async def adiscard(progress):
+    await progress.adelete()
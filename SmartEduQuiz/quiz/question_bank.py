@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Question, Quiz
+
+QuestionRecord = namedtuple('QuestionRecord', ['id', 'text', 'options', 'correct_answer'])
+
+BANK_CACHE_TIMEOUT = 60 * 60 * 24
+HITS_KEY = 'question_bank:hits'
+MISSES_KEY = 'question_bank:misses'
+
+
+def _key(quiz, suffix):
+    # The version stamp is part of every key, so a bump orphans the old entries.
+    return f'question_bank:{quiz.id}:{quiz.bank_version}:{suffix}'
+
+
+def _count(key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+async def _acount(key, amount):
+    if not amount:
+        return
+    try:
+        await cache.aincr(key, amount)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key, amount)
+
+
+def bump_bank_version(quiz_id):
+    """Invalidate every cached entry of a quiz's question bank."""
+    Quiz.objects.filter(id=quiz_id).update(bank_version=F('bank_version') + 1)
+
+
+def get_question_ids(quiz):
+    """Return the ids of every question in ``quiz`` as a tuple, in id order."""
+    key = _key(quiz, 'ids')
+    ids = cache.get(key)
+    if ids is None:
+        _count(MISSES_KEY, 1)
+        ids = tuple(quiz.questions.order_by('id').values_list('id', flat=True))
+        cache.set(key, ids, BANK_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY, 1)
+    return ids
+
+
+async def aget_question_ids(quiz):
+    """Async counterpart of get_question_ids()."""
+    key = _key(quiz, 'ids')
+    ids = await cache.aget(key)
+    if ids is None:
+        await _acount(MISSES_KEY, 1)
+        ids = tuple([question_id async for question_id in quiz.questions.order_by('id').values_list('id', flat=True)])
+        await cache.aset(key, ids, BANK_CACHE_TIMEOUT)
+    else:
+        await _acount(HITS_KEY, 1)
+    return ids
+
+
+def _split_cached(keys, cached):
+    records = {}
+    missing = []
+    for question_id, key in keys.items():
+        if key in cached:
+            records[question_id] = QuestionRecord(*cached[key])
+        else:
+            missing.append(question_id)
+    return records, missing
+
+
+def _missing_rows(quiz, missing):
+    return Question.objects.filter(quiz=quiz, id__in=missing).values_list(
+        'id', 'text', 'option1', 'option2', 'option3', 'option4', 'correct_answer'
+    )
+
+
+def _add_row(records, keys, row, fresh):
+    question_id, text, *options, correct_answer = row
+    record = QuestionRecord(question_id, text, tuple(options), correct_answer)
+    records[question_id] = record
+    fresh[keys[question_id]] = tuple(record)
+
+
+def get_questions(quiz, question_ids):
+    """Return QuestionRecords for ``question_ids`` in the given order.
+
+    Ids that no longer belong to the quiz are left out.
+    """
+    keys = {question_id: _key(quiz, question_id) for question_id in question_ids}
+    records, missing = _split_cached(keys, cache.get_many(keys.values()))
+    if missing:
+        fresh = {}
+        for row in _missing_rows(quiz, missing):
+            _add_row(records, keys, row, fresh)
+        cache.set_many(fresh, BANK_CACHE_TIMEOUT)
+    _count(HITS_KEY, len(keys) - len(missing))
+    _count(MISSES_KEY, len(missing))
+    return [records[question_id] for question_id in question_ids if question_id in records]
+
+
+async def aget_questions(quiz, question_ids):
+    """Async counterpart of get_questions()."""
+    keys = {question_id: _key(quiz, question_id) for question_id in question_ids}
+    records, missing = _split_cached(keys, await cache.aget_many(keys.values()))
+    if missing:
+        fresh = {}
+        async for row in _missing_rows(quiz, missing):
+            _add_row(records, keys, row, fresh)
+        await cache.aset_many(fresh, BANK_CACHE_TIMEOUT)
+    await _acount(HITS_KEY, len(keys) - len(missing))
+    await _acount(MISSES_KEY, len(missing))
+    return [records[question_id] for question_id in question_ids if question_id in records]
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0,
+    }
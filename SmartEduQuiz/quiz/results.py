@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import archive
+
+REVIEW_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Bump when quiz_results_review.html changes so cached fragments and ETags refresh.
+REVIEW_VERSION = 1
+
+
+def build_review(attempt):
+    """Return one dict per answered question, with the option list precomputed."""
+    review = []
+    for answer in archive.attempt_answers(attempt):
+        question = answer.question
+        options = []
+        for option in (question.option1, question.option2, question.option3, question.option4):
+            is_correct = option == question.correct_answer
+            is_selected = option == answer.selected_answer
+            options.append({'text': option, 'is_correct': is_correct, 'is_selected': is_selected})
+        review.append({'text': question.text, 'options': options})
+    return review
+
+
+def _stamp(attempt):
+    # What the page shows changes when the attempt is regraded (its score) or
+    # the quiz's questions are edited (its bank version); load attempt.quiz with it.
+    return f'{attempt.id}-{attempt.score}-{attempt.quiz.bank_version}-v{REVIEW_VERSION}'
+
+
+def attempt_etag(attempt):
+    return f'"attempt-{_stamp(attempt)}"'
+
+
+def render_review(attempt):
+    """Return the question review HTML of an attempt, rendering it once per attempt and bank version."""
+    key = f'quiz_results:{_stamp(attempt)}'
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('quiz_results_review.html', {'review': build_review(attempt)})
+        cache.set(key, html, REVIEW_CACHE_TIMEOUT)
+    return html
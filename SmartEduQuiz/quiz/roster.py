@@ -0,0 +1,184 @@
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .analytics import invalidate_snapshot
+from .importers import ImportReport
+from .models import Profile, RosterImport, User
+
+ROSTER_BATCH_SIZE = 1000
+ROSTER_FIELDS = ('email', 'first_name', 'class_section', 'password')
+FIELD_ALIASES = {'name': 'first_name', 'full_name': 'first_name', 'section': 'class_section'}
+
+
+def _init_worker():
+    django.setup()
+
+
+def _rows(lines):
+    """Yield (line number, field dict) for each non-blank CSV row; the header names the columns."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [cell.strip().lower() for cell in header]
+    header = [FIELD_ALIASES.get(name, name) for name in header]
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, {name: value.strip() for name, value in zip(header, row)}
+
+
+def _validate(fields, class_section):
+    email = User.objects.normalize_email(fields.get('email', ''))
+    if not email:
+        raise ValueError("empty email")
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError("invalid email")
+    if len(email) > User._meta.get_field('username').max_length:
+        raise ValueError("email is too long")
+    if not fields.get('password'):
+        raise ValueError("empty password")
+    return {
+        'email': email,
+        'first_name': fields.get('first_name', '')[:User._meta.get_field('first_name').max_length],
+        'class_section': fields.get('class_section') or class_section or '',
+        'password': fields['password'],
+    }
+
+
+def _hash_all(pool, workers, passwords):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def _create(rows):
+    """Insert users and their profiles for (fields, password hash) pairs; return the users."""
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=fields['email'], email=fields['email'], first_name=fields['first_name'], password=hashed)
+            for fields, hashed in rows
+        ])
+        Profile.objects.bulk_create([
+            Profile(user=user, role='student', class_section=fields['class_section'])
+            for user, (fields, _) in zip(users, rows)
+        ])
+    return users
+
+
+def _insert(pool, workers, batch, report, timings):
+    existing = set(
+        User.objects.filter(username__in=[fields['email'] for _, fields in batch]).values_list('username', flat=True)
+    )
+    fresh = []
+    for line_no, fields in batch:
+        if fields['email'] in existing:
+            report.skip(line_no, "email is already registered")
+        else:
+            fresh.append((line_no, fields))
+    if not fresh:
+        return
+
+    started = time.perf_counter()
+    hashes = _hash_all(pool, workers, [fields['password'] for _, fields in fresh])
+    timings['hashing'] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = [(fields, hashed) for (_, fields), hashed in zip(fresh, hashes)]
+    try:
+        created = len(_create(rows))
+    except IntegrityError:
+        # Someone registered one of these emails since the check above; retry
+        # the batch a row at a time so only the taken emails are skipped.
+        created = 0
+        for (line_no, _), row in zip(fresh, rows):
+            try:
+                created += len(_create([row]))
+            except IntegrityError:
+                report.skip(line_no, "email is already registered")
+    timings['inserting'] += time.perf_counter() - started
+    report.created += created
+
+
+def import_roster(lines, class_section=None, batch_size=ROSTER_BATCH_SIZE, workers=None):
+    """Create student accounts from CSV ``lines``; return (ImportReport, timings).
+
+    Columns are email, first_name, class_section and password, named by a
+    header row; ``class_section`` fills in rows that leave it blank.
+    Passwords are hashed across ``workers`` processes (default: every core)
+    and each batch of users and profiles is inserted in one transaction.
+    """
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport('students')
+    timings = {'hashing': 0.0, 'inserting': 0.0}
+    seen = set()
+    batch = []
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 1 else None
+    try:
+        for line_no, fields in _rows(lines):
+            try:
+                fields = _validate(fields, class_section)
+            except ValueError as exc:
+                report.skip(line_no, exc)
+                continue
+            if fields['email'] in seen:
+                report.skip(line_no, "duplicate email in file")
+                continue
+            seen.add(fields['email'])
+            batch.append((line_no, fields))
+            if len(batch) >= batch_size:
+                _insert(pool, workers, batch, report, timings)
+                batch = []
+        if batch:
+            _insert(pool, workers, batch, report, timings)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if report.created:
+        # bulk_create skips the Profile post_save signal that normally does this.
+        transaction.on_commit(invalidate_snapshot)
+    return report, timings
+
+
+def enqueue(user, text, class_section=None):
+    """Store an uploaded roster for ``import_roster --queued``; one INSERT, no hashing."""
+    return RosterImport.objects.create(uploaded_by=user, csv_text=text, class_section=class_section)
+
+
+def import_pending(workers=None):
+    """Import the oldest queued roster; return it, or None if the queue is empty.
+
+    The import is marked running before any account is created, so a second
+    worker moves on to the next upload. Its report, or the error that stopped
+    it, is saved on the RosterImport.
+    """
+    while True:
+        job = RosterImport.objects.filter(status='pending').order_by('id').first()
+        if job is None:
+            return None
+        # SQLite has no row locks; the conditional UPDATE lets one worker win.
+        if RosterImport.objects.filter(id=job.id, status='pending').update(status='running'):
+            job.status = 'running'
+            break
+    try:
+        report, _ = import_roster(io.StringIO(job.csv_text, newline=''), job.class_section, workers=workers)
+        job.status = 'done'
+        job.report = report.summary()
+    except Exception as exc:
+        job.status = 'failed'
+        job.report = repr(exc)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'report', 'finished_at'])
+    return job
@@ -0,0 +1,15 @@
+import random
+
+QUESTIONS_PER_ATTEMPT = 30
+
+
+def new_seed():
+    return random.getrandbits(32)
+
+
+def sample_question_ids(bank_ids, seed, count=QUESTIONS_PER_ATTEMPT):
+    """Return the ordered question ids an attempt with ``seed`` sees.
+
+    The same bank, seed and count always give the same selection.
+    """
+    return random.Random(seed).sample(bank_ids, min(count, len(bank_ids)))
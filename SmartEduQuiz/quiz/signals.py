@@ -0,0 +1,57 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import categories, item_analysis
+from .aggregates import remove_attempt
+from .analytics import invalidate_snapshot
+from .decorators import ROLE_SESSION_KEY
+from .models import Category, Profile, Question, Quiz, QuizAttempt
+from .question_bank import bump_bank_version
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_bank(sender, instance, **kwargs):
+    bump_bank_version(instance.quiz_id)
+
+
+@receiver(post_save, sender=QuizAttempt)
+@receiver(post_delete, sender=QuizAttempt)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=Profile)
+def invalidate_teacher_snapshot(sender, **kwargs):
+    # Wait for the commit so a concurrent dashboard load cannot cache pre-commit figures.
+    transaction.on_commit(invalidate_snapshot)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, **kwargs):
+    transaction.on_commit(categories.invalidate)
+
+
+@receiver(user_logged_in)
+def remember_role(sender, request, user, **kwargs):
+    profile = Profile.objects.filter(user=user).only('role').first()
+    if profile is not None:
+        request.session[ROLE_SESSION_KEY] = profile.role
+
+
+@receiver(post_save, sender=Question)
+def reset_item_analysis_on_edit(sender, instance, created, **kwargs):
+    # An edited answer key or option text invalidates the stored sums.
+    if not created:
+        item_analysis.reset(instance.quiz_id)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def reset_item_analysis_on_delete(sender, instance, **kwargs):
+    item_analysis.reset(instance.quiz_id)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def remove_attempt_from_totals(sender, instance, **kwargs):
+    remove_attempt(instance)
@@ -0,0 +1,163 @@
+// Client-side quiz navigation: load the question set once, keep answers in
+// the page, autosave periodically and submit the whole sheet in one request.
+// Without JavaScript the form falls back to the server-rendered flow.
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('quizForm');
+    if (!form || !form.dataset.apiUrl || !window.fetch) {
+        return;
+    }
+
+    const AUTOSAVE_INTERVAL = 30000;
+    const csrfToken = form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+    const questionText = document.getElementById('questionText');
+    const optionsList = document.getElementById('optionsList');
+    const progressFill = document.getElementById('progressFill');
+    const progressText = document.getElementById('progressText');
+    const previousBtn = document.getElementById('previousBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const bookmarkBtn = document.getElementById('bookmarkBtn');
+
+    let questions = [];
+    let answers = {};
+    let bookmarked = [];
+    let currentIndex = 0;
+    let dirty = false;
+    let submitting = false;
+
+    function postJson(url, body, keepalive) {
+        return fetch(url, {
+            method: 'POST',
+            credentials: 'same-origin',
+            keepalive: !!keepalive,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken
+            },
+            body: JSON.stringify(body)
+        });
+    }
+
+    function recordAnswer() {
+        const checked = optionsList.querySelector('input[name="answer"]:checked');
+        const question = questions[currentIndex];
+        if (checked && answers[question.id] !== checked.value) {
+            answers[question.id] = checked.value;
+            dirty = true;
+        }
+    }
+
+    function render() {
+        const question = questions[currentIndex];
+        questionText.textContent = question.text;
+        optionsList.innerHTML = '';
+        question.options.forEach(function(option) {
+            const item = document.createElement('li');
+            item.className = 'option-item';
+            const label = document.createElement('label');
+            label.className = 'option-label';
+            const input = document.createElement('input');
+            input.type = 'radio';
+            input.name = 'answer';
+            input.value = option;
+            input.className = 'option-input';
+            input.checked = answers[question.id] === option;
+            label.appendChild(input);
+            label.appendChild(document.createTextNode(' ' + option));
+            item.appendChild(label);
+            optionsList.appendChild(item);
+        });
+        progressFill.style.width = ((currentIndex + 1) / questions.length * 100) + '%';
+        progressText.textContent = (currentIndex + 1) + '/' + questions.length;
+        previousBtn.disabled = currentIndex === 0;
+        nextBtn.textContent = currentIndex === questions.length - 1 ? 'Submit' : 'Next';
+        if (bookmarkBtn) {
+            bookmarkBtn.setAttribute('data-question-id', question.id);
+            bookmarkBtn.classList.toggle('active', bookmarked.indexOf(question.id) !== -1);
+        }
+    }
+
+    function autosave(keepalive) {
+        if (!dirty || submitting) {
+            return;
+        }
+        dirty = false;
+        postJson(form.dataset.autosaveUrl, {answers: answers, current_index: currentIndex}, keepalive)
+            .catch(function() { dirty = true; });
+    }
+
+    function submit() {
+        submitting = true;
+        nextBtn.disabled = true;
+        postJson(form.dataset.submitUrl, {answers: answers})
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                if (data.status === 'success') {
+                    window.location.href = data.results_url;
+                } else {
+                    submitting = false;
+                    nextBtn.disabled = false;
+                    alert(data.message || 'Could not submit the quiz. Please try again.');
+                }
+            })
+            .catch(function() {
+                submitting = false;
+                nextBtn.disabled = false;
+                alert('Could not submit the quiz. Please check your connection and try again.');
+            });
+    }
+
+    fetch(form.dataset.apiUrl, {credentials: 'same-origin'})
+        .then(function(response) { return response.json(); })
+        .then(function(payload) {
+            if (!payload.questions || !payload.questions.length) {
+                return;
+            }
+            questions = payload.questions;
+            answers = payload.answers || {};
+            bookmarked = (payload.bookmarked_questions || []).map(Number);
+            currentIndex = payload.current_index || 0;
+            render();
+
+            form.addEventListener('submit', function(event) {
+                event.preventDefault();
+                if (submitting) {
+                    return;
+                }
+                recordAnswer();
+                const action = event.submitter ? event.submitter.value : 'next';
+                if (action === 'previous' && currentIndex > 0) {
+                    currentIndex -= 1;
+                } else if (action === 'next') {
+                    if (currentIndex < questions.length - 1) {
+                        currentIndex += 1;
+                    } else {
+                        submit();
+                        return;
+                    }
+                }
+                dirty = true;
+                render();
+            });
+            if (bookmarkBtn) {
+                bookmarkBtn.addEventListener('click', function() {
+                    const questionId = Number(this.getAttribute('data-question-id'));
+                    const position = bookmarked.indexOf(questionId);
+                    if (position === -1) {
+                        bookmarked.push(questionId);
+                    } else {
+                        bookmarked.splice(position, 1);
+                    }
+                });
+            }
+            setInterval(autosave, AUTOSAVE_INTERVAL);
+            document.addEventListener('visibilitychange', function() {
+                if (document.visibilityState === 'hidden') {
+                    recordAnswer();
+                    autosave(true);
+                }
+            });
+        })
+        .catch(function() {
+            // Keep the server-rendered form working if the API is unavailable.
+        });
+});
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import question_bank
+from .grading import grade_submission
+from .models import PendingSubmission
+
+GRADER_BATCH_SIZE = 100
+
+
+def queued():
+    """Whether final submissions are queued for run_grader instead of graded inline."""
+    return getattr(settings, 'QUIZ_QUEUED_GRADING', False)
+
+
+def enqueue(user, quiz, questions, answers, class_section=None):
+    """Durably store a finished answer sheet; one INSERT, no grading."""
+    return PendingSubmission.objects.create(
+        user=user,
+        quiz=quiz,
+        question_ids=[question.id for question in questions],
+        answers={str(question_id): text for question_id, text in answers.items()},
+        class_section=class_section,
+    )
+
+
+def _claim(batch_size):
+    """Mark up to ``batch_size`` pending submissions as processing and return their ids.
+
+    One UPDATE ... RETURNING, so two workers can never claim the same row:
+    SQLite has no row locks, and SELECT ... FOR UPDATE is a no-op there.
+    """
+    table = connection.ops.quote_name(PendingSubmission._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET status = 'processing' WHERE id IN "
+            f"(SELECT id FROM {table} WHERE status = 'pending' ORDER BY id LIMIT %s) RETURNING id",
+            [batch_size],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def requeue_processing():
+    """Put submissions left processing by a stopped worker back in the queue."""
+    return PendingSubmission.objects.filter(status='processing').update(status='pending')
+
+
+def grade_pending(batch_size=GRADER_BATCH_SIZE):
+    """Grade up to ``batch_size`` queued submissions in one transaction.
+
+    Returns the number of submissions taken off the queue. A submission that
+    fails to grade is marked failed without affecting the rest of the batch.
+    Claimed submissions go back to pending if the batch cannot be saved.
+    """
+    claimed = _claim(batch_size)
+    if not claimed:
+        return 0
+    batch = list(PendingSubmission.objects.filter(id__in=claimed).select_related('user', 'quiz').order_by('id'))
+    try:
+        with transaction.atomic():
+            for pending in batch:
+                questions = question_bank.get_questions(pending.quiz, pending.question_ids)
+                try:
+                    pending.attempt = grade_submission(
+                        pending.user, pending.quiz, questions, pending.answers, pending.class_section
+                    )
+                    pending.status = 'done'
+                except Exception as exc:
+                    pending.status = 'failed'
+                    pending.error = repr(exc)
+                pending.graded_at = timezone.now()
+            PendingSubmission.objects.bulk_update(batch, ['status', 'attempt', 'error', 'graded_at'])
+    except BaseException:
+        PendingSubmission.objects.filter(id__in=claimed, status='processing').update(status='pending')
+        raise
+    return len(batch)
@@ -1,3 +1,1096 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, models
+from django.db.models import Sum
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    adaptive, analytics, archive, categories, importers, item_analysis, leaderboard, progress, question_bank, roster,
+    submissions,
+)
+from .grading import delete_attempts, grade_answers, grade_submission, regrade_attempts
+from .models import (
+    ArchivedAnswers, ArchivedOptions, Category, CategoryStats, InProgressAttempt, PendingSubmission, Profile, Question, Quiz,
+    QuizAttempt, RosterImport, ScoreBucket, StudentStats, User, UserAnswer,
+)
+
+# Tables a hot path may read in full: tiny, fixed-size lookup tables.
+FULL_SCAN_ALLOWED = {'quiz_category'}
+
+
+class QuizTestCase(TestCase):
+    """A teacher, a student in 10A, a 40-question Math quiz and one graded 30-question attempt."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher@example.com', first_name='Teacher')
+        Profile.objects.create(user=cls.teacher, role='teacher', department='Maths')
+        cls.student = User.objects.create(username='student@example.com', first_name='Student')
+        Profile.objects.create(user=cls.student, role='student', class_section='10A')
+        # Seeded by migration 0009.
+        cls.category = Category.objects.get(name='Math')
+        cls.quiz = Quiz.objects.create(title='Algebra', category=cls.category, created_by=cls.teacher)
+        Question.objects.bulk_create([
+            Question(quiz=cls.quiz, text=f'Question {i}', option1='a', option2='b', option3='c',
+                     option4='d', correct_answer='a')
+            for i in range(40)
+        ])
+        questions = list(cls.quiz.questions.all()[:30])
+        cls.attempt = grade_submission(
+            cls.student, cls.quiz, questions, {question.id: 'a' for question in questions}, '10A'
+        )
+
+    def setUp(self):
+        cache.clear()
+        categories.invalidate()
+        self.client.force_login(self.student)
+
+    def full_scans(self, queries, allowed=(), index_only=()):
+        """Return the table scans in the plans of ``queries``.
+
+        A bare "SCAN t" reads table t; "SCAN t USING COVERING INDEX i" reads
+        every entry of index i, which is no better on a large table, so it is
+        only accepted for the tables a test names in ``index_only``.
+        "SCAN t USING INDEX i" walks the index in order and stops at the LIMIT.
+        """
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    match = re.fullmatch(r'SCAN (\S+)( USING COVERING INDEX \S+)?', row[-1])
+                    if match is None:
+                        continue
+                    table, covering = match.groups()
+                    if table in FULL_SCAN_ALLOWED | set(allowed):
+                        continue
+                    if covering and table in index_only:
+                        continue
+                    scans.append(f'{row[-1]}  <-  {sql}')
+        return scans
+
+    def assertNoScans(self, queries, **kwargs):
+        scans = self.full_scans(queries, **kwargs)
+        self.assertEqual(scans, [], '\n'.join(scans))
+
+    def assertIndexed(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400)
+        self.assertNoScans(ctx.captured_queries)
+        return response
+
+
+class QueryPlanTests(QuizTestCase):
+    """Fail when a hot view query stops using an index and scans a whole table."""
+
+    def test_student_dashboard(self):
+        self.assertIndexed('get', reverse('dashboard'))
+
+    def test_teacher_dashboard(self):
+        self.client.force_login(self.teacher)
+        analytics.class_snapshot()
+        self.assertIndexed('get', reverse('dashboard'))
+
+    def test_teacher_snapshot_recompute(self):
+        # The class average sums one summary row per student. The grouped figures
+        # read the attempt indexes in full, once per snapshot TTL, never per request.
+        with CaptureQueriesContext(connection) as ctx:
+            analytics._compute_class_snapshot()
+        self.assertNoScans(
+            ctx.captured_queries, allowed={'quiz_studentstats'}, index_only={'quiz_quiz', 'quiz_quizattempt'}
+        )
+
+    def test_quiz_list_category(self):
+        self.assertIndexed('get', reverse('quiz_list_category', args=[self.category.id]))
+
+    def test_quiz_navigation_and_submission(self):
+        url = reverse('start_quiz', args=[self.quiz.id])
+        self.assertIndexed('get', url)
+        self.assertIndexed('post', url, data={'action': 'next', 'answer': 'a'})
+        self.assertIndexed('post', url, data={'action': 'previous'})
+
+    def test_quiz_api(self):
+        self.assertIndexed('get', reverse('quiz_api', args=[self.quiz.id]))
+        self.assertIndexed(
+            'post', reverse('quiz_api_submit', args=[self.quiz.id]),
+            data=json.dumps({'answers': {}}), content_type='application/json'
+        )
+
+    def test_quiz_results(self):
+        self.assertIndexed('get', reverse('quiz_results', args=[self.attempt.id]))
+
+
+
+class GradingTests(QuizTestCase):
+    """The batched grading engine and regrades."""
+
+    def test_grade_answers(self):
+        questions = list(self.quiz.questions.order_by('id')[:3])
+        # Keys arrive as strings from forms and JSON.
+        score, rows = grade_answers(questions, {str(questions[0].id): 'a', str(questions[1].id): 'b'})
+        self.assertEqual(score, 1)
+        self.assertEqual(
+            [(row.question_id, row.selected_answer, row.is_correct) for row in rows],
+            [(questions[0].id, 'a', True), (questions[1].id, 'b', False), (questions[2].id, '', False)],
+        )
+
+    def test_single_transaction(self):
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        with CaptureQueriesContext(connection) as ctx:
+            attempt = grade_submission(
+                self.student, self.quiz, questions, {question.id: 'a' for question in questions[:12]}, batch_size=10
+            )
+        sql = [query['sql'] for query in ctx.captured_queries]
+        # Inside the test's transaction the atomic block is a savepoint around every write.
+        self.assertTrue(sql[0].startswith('SAVEPOINT') and sql[-1].startswith('RELEASE SAVEPOINT'))
+        self.assertEqual(sum(query.startswith('SAVEPOINT') for query in sql), 1)
+        self.assertEqual(sum(query.startswith('INSERT INTO "quiz_useranswer"') for query in sql), 3)
+        self.assertEqual((attempt.score, attempt.answers.count()), (12, 30))
+
+        # A failure after the inserts leaves nothing behind.
+        counts = (QuizAttempt.objects.count(), UserAnswer.objects.count())
+        with mock.patch('quiz.grading.record_attempt', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                grade_submission(self.student, self.quiz, questions, {})
+        self.assertEqual((QuizAttempt.objects.count(), UserAnswer.objects.count()), counts)
+        self.assertEqual(StudentStats.objects.get(user=self.student).attempt_count, 2)
+
+    def test_regrade(self):
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        Question.objects.filter(id__in=[question.id for question in questions[:5]]).update(correct_answer='b')
+        self.assertEqual(regrade_attempts(QuizAttempt.objects.filter(id=self.attempt.id)), 1)
+        marks = dict(self.attempt.answers.values_list('question_id', 'is_correct'))
+        self.assertEqual(marks, {question.id: i >= 5 for i, question in enumerate(questions)})
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 25)
+        stats = StudentStats.objects.get(user=self.student)
+        self.assertEqual((stats.score_total, stats.average_score), (25, 25.0))
+
+
+class TeacherSnapshotTests(QuizTestCase):
+    """The cached class-wide figures on the teacher dashboard."""
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create(username='other@example.com', first_name='Other')
+        Profile.objects.create(user=other, role='student', class_section='10B')
+        science = Category.objects.create(name='Science', description='')
+        self.science_quiz = Quiz.objects.create(title='Cells', category=science, created_by=self.teacher)
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        grade_submission(other, self.science_quiz, questions, {question.id: 'a' for question in questions[:10]})
+
+    def invalidates(self, change):
+        version = cache.get(analytics.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        return cache.get(analytics.VERSION_KEY) != version
+
+    def test_figures(self):
+        snapshot = analytics.class_snapshot()
+        self.assertEqual(snapshot['total_students'], 2)
+        self.assertEqual(snapshot['avg_class_score'], 20)
+        self.assertEqual(snapshot['weakest_subject'], 'Science')
+        self.assertEqual(
+            [(row['student_name'], row['quiz_title'], row['score']) for row in snapshot['student_progress']],
+            [('Student', 'Algebra', 30), ('Other', 'Cells', 10)],
+        )
+        self.assertEqual(
+            [(row['quiz_title'], row['avg_score']) for row in snapshot['recent_quizzes']],
+            [('Cells', 10), ('Algebra', 30)],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(analytics.class_snapshot(), snapshot)
+
+    def test_changes_replace_the_version(self):
+        analytics.class_snapshot()
+        self.assertTrue(self.invalidates(lambda: self.attempt.save()))
+        self.assertTrue(self.invalidates(lambda: self.science_quiz.save()))
+        self.assertTrue(self.invalidates(lambda: self.student.profile.save()))
+        self.assertFalse(self.invalidates(lambda: self.student.save()))
+
+        # A new answer key only reaches the scores through a regrade.
+        first_ten = self.quiz.questions.order_by('id').values('id')[:10]
+        Question.objects.filter(id__in=first_ten).update(correct_answer='b')
+        self.assertEqual(analytics.class_snapshot()['avg_class_score'], 20)
+        self.assertTrue(self.invalidates(lambda: regrade_attempts(QuizAttempt.objects.all())))
+        self.assertEqual(analytics.class_snapshot()['avg_class_score'], 10)
+
+
+class ScoreTotalsTests(QuizTestCase):
+    """Per-student and per-category totals kept in step with the attempt table."""
+
+    def totals(self):
+        student = StudentStats.objects.filter(user=self.student).values_list(
+            'attempt_count', 'score_total', 'question_total', 'average_score', 'class_section'
+        ).first()
+        by_category = CategoryStats.objects.filter(user=self.student).order_by('category__name').values_list(
+            'category__name', 'attempt_count', 'score_total', 'question_total'
+        )
+        return student, list(by_category)
+
+    def test_grading_and_rebuild(self):
+        self.assertEqual(self.totals(), ((1, 30, 30, 30.0, '10A'), [('Math', 1, 30, 30)]))
+        grade_submission(self.student, self.quiz, list(self.quiz.questions.all()[:10]), {})
+        expected = ((2, 30, 40, 15.0, '10A'), [('Math', 2, 30, 40)])
+        self.assertEqual(self.totals(), expected)
+
+        StudentStats.objects.update(score_total=0, average_score=0)
+        CategoryStats.objects.all().delete()
+        call_command('rebuild_aggregates', stdout=io.StringIO())
+        self.assertEqual(self.totals(), expected)
+
+    def test_regrading(self):
+        Question.objects.filter(quiz=self.quiz).update(correct_answer='b')
+        regrade_attempts(QuizAttempt.objects.filter(id=self.attempt.id))
+        self.assertEqual(self.totals(), ((1, 0, 30, 0.0, '10A'), [('Math', 1, 0, 30)]))
+
+    def test_deleting_attempts(self):
+        category = Category.objects.exclude(id=self.category.id).order_by('name').first()
+        other = Quiz.objects.create(title='Reading', category=category, created_by=self.teacher)
+        question = Question.objects.create(
+            quiz=other, text='Q', option1='a', option2='b', option3='c', option4='d', correct_answer='a'
+        )
+        grade_submission(self.student, other, [question], {question.id: 'a'})
+        # Deleted one at a time, as the admin's delete view does.
+        self.attempt.delete()
+        self.assertEqual(self.totals(), ((1, 1, 1, 1.0, '10A'), [(category.name, 1, 1, 1)]))
+        # A cascade from the quiz takes its attempts out of the totals too.
+        other.delete()
+        self.assertEqual(self.totals(), (None, []))
+
+    def test_backfill_migration(self):
+        migration = importlib.import_module('quiz.migrations.0002_score_aggregates')
+        StudentStats.objects.all().delete()
+        CategoryStats.objects.all().delete()
+        migration.backfill_totals(apps, None)
+        self.assertEqual(
+            (self.totals()[0][:3], self.totals()[1]), ((1, 30, 30), [('Math', 1, 30, 30)])
+        )
+
+
+class LeaderboardTests(QuizTestCase):
+    """Ranks and sections read from StudentStats."""
+
+    def add_student(self, username, class_section, score):
+        user = User.objects.create(username=username)
+        Profile.objects.create(user=user, role='student', class_section=class_section)
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        answers = {question.id: 'a' if i < score else 'b' for i, question in enumerate(questions)}
+        grade_submission(user, self.quiz, questions, answers, class_section)
+        return StudentStats.objects.get(user=user)
+
+    def test_rank(self):
+        tied = self.add_student('tied@example.com', '10A', 30)
+        lower = self.add_student('lower@example.com', '10A', 20)
+        other = self.add_student('other@example.com', '10B', 25)
+        self.assertEqual([leaderboard.rank_of(stats, '10A') for stats in (tied, lower)], [1, 3])
+        self.assertEqual([leaderboard.rank_of(stats) for stats in (tied, other, lower)], [1, 3, 4])
+        self.assertEqual((leaderboard.board_size('10A'), leaderboard.board_size()), (3, 4))
+        self.assertIsNone(leaderboard.rank_of(None))
+        # The bucket sums and the in-band count are index range reads, never scans.
+        with CaptureQueriesContext(connection) as ctx:
+            leaderboard.rank_of(lower, '10A')
+            leaderboard.rank_of(lower)
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plan = cursor.fetchall()[-1][-1]
+                self.assertRegex(plan, r'^SEARCH .* USING (COVERING )?INDEX')
+
+    def test_rank_within_band(self):
+        ahead = self.add_student('ahead@example.com', '10A', 26)
+        behind = self.add_student('behind@example.com', '10A', 25)
+        # Both in the 26.0-26.1 band, so the band count alone cannot order them.
+        StudentStats.objects.filter(pk=ahead.pk).update(average_score=26.07)
+        StudentStats.objects.filter(pk=behind.pk).update(average_score=26.02)
+        ahead.refresh_from_db()
+        behind.refresh_from_db()
+        for section in ('10A', None):
+            expected = leaderboard._board(section).filter(average_score__gt=behind.average_score).count() + 1
+            self.assertEqual(leaderboard.rank_of(behind, section), expected)
+            self.assertEqual(leaderboard.rank_of(ahead, section), expected - 1)
+
+    def test_top_students(self):
+        first = self.add_student('first@example.com', '10B', 28)
+        second = self.add_student('second@example.com', '10A', 28)
+        self.add_student('third@example.com', '10B', 10)
+        # Ties go to the earlier user.
+        self.assertEqual(
+            [stats.user_id for stats in leaderboard.top_students(3)],
+            [self.student.id, first.user_id, second.user_id],
+        )
+        self.assertEqual(
+            [stats.user.username for stats in leaderboard.top_students(5, '10B')],
+            ['first@example.com', 'third@example.com'],
+        )
+        self.assertEqual(leaderboard.top_students(3, '10C'), [])
+
+    def test_buckets_follow_stats(self):
+        def buckets(scope):
+            return dict(
+                ScoreBucket.objects.filter(scope=scope, students__gt=0).values_list('bucket', 'students')
+            )
+
+        def expected(section=None):
+            counts = {}
+            for average in leaderboard._board(section).values_list('average_score', flat=True):
+                bucket = int(average * leaderboard.BUCKETS_PER_POINT)
+                counts[bucket] = counts.get(bucket, 0) + 1
+            return counts
+
+        def check():
+            for scope in ('', '10A', '10B'):
+                self.assertEqual(buckets(scope), expected(scope), scope)
+
+        moved = self.add_student('moved@example.com', '10A', 12)
+        self.add_student('kept@example.com', '10B', 18)
+        check()
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        grade_submission(moved.user, self.quiz, questions, {}, '10B')
+        check()
+        delete_attempts(QuizAttempt.objects.filter(user=moved.user))
+        check()
+        StudentStats.objects.filter(user=self.student).delete()
+        call_command('rebuild_aggregates', stdout=io.StringIO())
+        check()
+        self.assertEqual((leaderboard.board_size(), leaderboard.board_size('10B')), (2, 1))
+
+    def test_section(self):
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        # The queued grader and the API may not know the section.
+        grade_submission(self.student, self.quiz, questions, {})
+        stats = StudentStats.objects.get(user=self.student)
+        self.assertEqual((stats.class_section, stats.attempt_count), ('10A', 2))
+        grade_submission(self.student, self.quiz, questions, {}, '10B')
+        self.assertEqual(StudentStats.objects.get(user=self.student).class_section, '10B')
+        newcomer = User.objects.create(username='newcomer@example.com')
+        grade_submission(newcomer, self.quiz, questions, {})
+        self.assertIsNone(StudentStats.objects.get(user=newcomer).class_section)
+
+
+class QuestionBankTests(QuizTestCase):
+    """The versioned question-bank cache and its counters."""
+
+    def stats(self):
+        out = io.StringIO()
+        call_command('question_bank_stats', stdout=out)
+        return out.getvalue().strip()
+
+    def test_second_fetch_is_a_hit(self):
+        ids = question_bank.get_question_ids(self.quiz)
+        self.assertEqual(list(ids), list(self.quiz.questions.order_by('id').values_list('id', flat=True)))
+        with self.assertNumQueries(0):
+            self.assertEqual(question_bank.get_question_ids(self.quiz), ids)
+        self.assertEqual(self.stats(), 'hits=1 misses=1 hit_ratio=50.00%')
+
+        picked = [ids[3], ids[1]]
+        records = question_bank.get_questions(self.quiz, picked)
+        self.assertEqual([record.id for record in records], picked)
+        self.assertEqual(records[0].options, ('a', 'b', 'c', 'd'))
+        with self.assertNumQueries(0):
+            self.assertEqual(question_bank.get_questions(self.quiz, picked), records)
+        self.assertEqual(self.stats(), 'hits=3 misses=3 hit_ratio=50.00%')
+
+    def test_question_changes_bump_the_version(self):
+        question = self.quiz.questions.order_by('id').first()
+        self.assertEqual(question_bank.get_questions(self.quiz, [question.id])[0].text, 'Question 0')
+        ids = question_bank.get_question_ids(self.quiz)
+        version = self.quiz.bank_version
+
+        question.text = 'Edited'
+        question.save()
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.bank_version, version + 1)
+        self.assertEqual(question_bank.get_questions(self.quiz, [question.id])[0].text, 'Edited')
+
+        question.delete()
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.bank_version, version + 2)
+        self.assertEqual(question_bank.get_question_ids(self.quiz), ids[1:])
+        self.assertEqual(question_bank.get_questions(self.quiz, [question.id]), [])
+
+
+class QuestionImportTests(QuizTestCase):
+    """Streamed question-bank imports."""
+
+    def test_csv(self):
+        version = self.quiz.bank_version
+        lines = [
+            'correct_answer,text,option1,option2,option3,option4',
+            '4,Two plus two?,3,4,5,6',
+            '',
+            '"x, y",Quoted?,"x, y",z,w,v',
+            'a,Too short?,a,b',
+            'q,Wrong key?,a,b,c,d',
+        ]
+        report = importers.import_questions(self.quiz, lines, 'csv', batch_size=1)
+        self.assertEqual((report.created, report.skipped), (2, 2))
+        self.assertEqual(
+            report.summary(),
+            "Imported 2 questions, skipped 2 invalid lines: 1 x empty option3, option4 (lines 5); "
+            "1 x correct answer is not one of the options (lines 6).",
+        )
+        question = self.quiz.questions.get(text='Quoted?')
+        self.assertEqual((question.option1, question.correct_answer), ('x, y', 'x, y'))
+        self.quiz.refresh_from_db()
+        self.assertGreater(self.quiz.bank_version, version)
+
+    def test_jsonl(self):
+        rows = [
+            {'text': 'Capital of France?', 'option1': 'Paris', 'option2': 'Rome', 'option3': 'Oslo',
+             'option4': 'Bern', 'correct_answer': 'Paris'},
+            ['Listed?', 'yes', 'no', 'maybe', 'never', 'yes'],
+            {'text': 'Null option?', 'option1': 'a', 'option2': None, 'option3': 'c', 'option4': 'd',
+             'correct_answer': 'a'},
+            {'text': 'Number?', 'option1': 1, 'option2': 2, 'option3': 3, 'option4': 4, 'correct_answer': 1},
+            ['Null in a list?', 'a', None, 'c', 'd', 'a'],
+        ]
+        lines = [json.dumps(row) for row in rows] + ['{not json', '"a string"']
+        report = importers.import_questions(self.quiz, lines, 'jsonl')
+        self.assertEqual((report.created, report.skipped), (2, 5))
+        self.assertEqual(report.reasons, {
+            'empty option2': [1, [3]],
+            'option1, option2, option3, option4, correct_answer must be text': [1, [4]],
+            'option2 must be text': [1, [5]],
+            'not valid JSON': [2, [6, 7]],
+        })
+        self.assertFalse(Question.objects.filter(option2='None').exists())
+
+    def test_duplicates(self):
+        lines = ['Question 0|a|b|c|d|a', 'New?|a|b|c|d|a', ' New? |a|b|c|d|b']
+        report = importers.import_questions(self.quiz, lines)
+        self.assertEqual((report.created, report.reasons), (1, {'duplicate question': [2, [1, 3]]}))
+        self.assertEqual(importers.import_questions(self.quiz, lines).created, 0)
+        self.assertEqual(self.quiz.questions.count(), 41)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTests(QuizTestCase):
+    """Student roster imports, from the command line and queued from the dashboard."""
+
+    def test_import(self):
+        lines = [
+            'Email,Name,Section,Password',
+            'one@example.com,One,,pw1',
+            'two@example.com,Two,10B,pw2',
+            'not-an-email,Bad,,pw',
+            'student@example.com,Taken,,pw',
+            'one@EXAMPLE.COM,Again,,pw',
+        ]
+        report, _ = roster.import_roster(lines, '10A', batch_size=1, workers=1)
+        self.assertEqual((report.created, report.skipped), (2, 3))
+        self.assertEqual(
+            dict(Profile.objects.filter(user__username__in=['one@example.com', 'two@example.com'])
+                 .values_list('user__username', 'class_section')),
+            {'one@example.com': '10A', 'two@example.com': '10B'},
+        )
+        self.assertTrue(User.objects.get(username='one@example.com').check_password('pw1'))
+
+    def test_email_registered_during_import(self):
+        lines = ['email,password', 'a@example.com,pw', 'b@example.com,pw', 'c@example.com,pw']
+        hash_all = roster._hash_all
+
+        def register_b_first(*args):
+            # Another request signs b@ up between the existence check and the insert.
+            User.objects.create(username='b@example.com')
+            return hash_all(*args)
+
+        with mock.patch.object(roster, '_hash_all', side_effect=register_b_first):
+            report, _ = roster.import_roster(lines, workers=1)
+        self.assertEqual((report.created, report.reasons), (2, {'email is already registered': [1, [3]]}))
+        self.assertTrue(User.objects.filter(username='c@example.com', profile__role='student').exists())
+
+    def test_queued_upload(self):
+        self.client.force_login(self.teacher)
+        upload = io.BytesIO('\ufeffemail,first_name,password\r\nnew@example.com,New,pw\r\n'.encode())
+        upload.name = 'roster.csv'
+        response = self.client.post(reverse('import_roster'), {'roster_file': upload, 'class_section': '10C'})
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertFalse(User.objects.filter(username='new@example.com').exists())
+
+        out = io.StringIO()
+        call_command('import_roster', queued=True, once=True, workers=1, stdout=out)
+        job = RosterImport.objects.get()
+        self.assertEqual((job.status, job.report), ('done', 'Imported 1 students.'))
+        self.assertEqual(User.objects.get(username='new@example.com').profile.class_section, '10C')
+        self.assertIn('Processed 1 uploaded rosters', out.getvalue())
+        self.assertContains(self.client.get(reverse('dashboard')), 'Imported 1 students.')
+        self.assertIsNone(roster.import_pending(workers=1))
+
+
+class ProgressTests(QuizTestCase):
+    """Server-side state of attempts under way."""
+
+    def test_bank_edit_mid_attempt(self):
+        url = reverse('start_quiz', args=[self.quiz.id])
+        self.client.get(url)
+        state = InProgressAttempt.objects.get(user=self.student, quiz=self.quiz)
+        chosen = state.question_ids
+        self.assertEqual(len(set(chosen)), 30)
+        self.client.post(url, {'action': 'next', 'answer': 'a'})
+
+        # New questions stay out of the attempt; a deleted one drops out, the rest keep their order.
+        for i in range(10):
+            Question.objects.create(quiz=self.quiz, text=f'Added {i}', option1='a', option2='b', option3='c',
+                                    option4='d', correct_answer='a')
+        Question.objects.get(id=chosen[1]).delete()
+        self.quiz.refresh_from_db()
+        state.refresh_from_db()
+        remaining = chosen[:1] + chosen[2:]
+        self.assertEqual([question.id for question in progress.selected_questions(state, self.quiz)], remaining)
+        self.assertEqual(progress.load_answers(state), {chosen[0]: 'a'})
+
+        response = self.client.post(
+            reverse('quiz_api_submit', args=[self.quiz.id]), data=json.dumps({'answers': {}}),
+            content_type='application/json'
+        )
+        attempt = QuizAttempt.objects.get(id=response.json()['attempt_id'])
+        self.assertEqual((attempt.score, attempt.total_questions), (1, 29))
+        self.assertEqual(set(attempt.answers.values_list('question_id', flat=True)), set(remaining))
+
+    def test_purge_throttled(self):
+        other = Quiz.objects.create(title='Geometry', category=self.category, created_by=self.teacher)
+        expired = timezone.now() - timedelta(seconds=progress.PROGRESS_TTL + 1)
+
+        def abandon():
+            return InProgressAttempt.objects.create(
+                user=self.teacher, quiz=other, question_ids=[], updated_at=expired
+            )
+
+        abandoned = abandon()
+        started = progress.get_or_start(self.student, self.quiz)
+        self.assertFalse(InProgressAttempt.objects.filter(id=abandoned.id).exists())
+        # Later starts within the interval leave the purge to the next one.
+        abandoned = abandon()
+        progress.discard(started)
+        progress.get_or_start(self.student, self.quiz)
+        self.assertTrue(InProgressAttempt.objects.filter(id=abandoned.id).exists())
+
+
+class QuizApiTests(QuizTestCase):
+    """The JSON quiz API."""
+
+    def post(self, name, data):
+        return self.client.post(reverse(name, args=[self.quiz.id]), data=json.dumps(data),
+                                content_type='application/json')
+
+    def test_submit_needs_live_attempt(self):
+        # Nothing started: nothing is created or graded.
+        self.assertEqual(self.post('quiz_api_submit', {'answers': {}}).status_code, 409)
+        self.assertEqual(self.post('quiz_api_autosave', {'answers': {}}).status_code, 409)
+        self.assertFalse(InProgressAttempt.objects.exists())
+
+        question_id = self.client.get(reverse('quiz_api', args=[self.quiz.id])).json()['questions'][0]['id']
+        self.assertEqual(self.post('quiz_api_autosave', {'answers': {question_id: 'a'}}).json()['saved'], 1)
+        response = self.post('quiz_api_submit', {'answers': {}})
+        self.assertEqual(response.json()['score'], 1)
+        # A replayed POST, or a second tab submitting the same attempt.
+        replay = self.post('quiz_api_submit', {'answers': {}})
+        self.assertEqual(replay.status_code, 409)
+        self.assertIn('already submitted', replay.json()['message'])
+        self.assertEqual(QuizAttempt.objects.filter(user=self.student).count(), 2)
+
+    def test_claim_once(self):
+        state = progress.get_or_start(self.student, self.quiz)
+        self.assertTrue(progress.claim(state))
+        self.assertFalse(progress.claim(state))
+
+
+class ResultsPageTests(QuizTestCase):
+    """The cached results review and its conditional GETs."""
+
+    def test_conditional_get(self):
+        url = reverse('quiz_results', args=[self.attempt.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # An edited question shows at once, through a new ETag and a new cached fragment.
+        question = self.attempt.answers.order_by('id').first().question
+        question.text = 'Reworded question'
+        question.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Reworded question')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # So does a regrade.
+        etag = response['ETag']
+        Question.objects.filter(id=question.id).update(correct_answer='b')
+        regrade_attempts(QuizAttempt.objects.filter(id=self.attempt.id))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(ROOT_URLCONF='SmartEduQuiz1.async_urls')
+class AsyncViewTests(QuizTestCase):
+    """The student endpoints of quiz.async_views, through AsyncClient."""
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.student)
+
+    async def post_json(self, name, data):
+        return await self.async_client.post(
+            reverse(name, args=[self.quiz.id]), data=json.dumps(data), content_type='application/json'
+        )
+
+    async def test_start_quiz(self):
+        url = reverse('start_quiz', args=[self.quiz.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.resolver_match.func.__module__, 'quiz.async_views')
+        self.assertContains(response, 'Question ')
+        await self.async_client.post(url, {'action': 'next', 'answer': 'a'})
+        state = await InProgressAttempt.objects.aget(user=self.student, quiz=self.quiz)
+        self.assertEqual(state.current_index, 1)
+        await self.async_client.post(url, {'action': 'previous'})
+        await state.arefresh_from_db()
+        self.assertEqual(state.current_index, 0)
+
+        await progress.asave_position(state, current_index=len(state.question_ids) - 1)
+        response = await self.async_client.post(url, {'action': 'next', 'answer': 'a'})
+        attempt = await QuizAttempt.objects.filter(user=self.student).alatest('id')
+        self.assertRedirects(response, reverse('quiz_results', args=[attempt.id]), fetch_redirect_response=False)
+        self.assertEqual((attempt.score, attempt.total_questions), (2, 30))
+
+    async def test_quiz_api(self):
+        self.assertEqual((await self.post_json('quiz_api_submit', {'answers': {}})).status_code, 409)
+        payload = (await self.async_client.get(reverse('quiz_api', args=[self.quiz.id]))).json()
+        self.assertEqual(len(payload['questions']), 30)
+        first, second = (question['id'] for question in payload['questions'][:2])
+        response = await self.post_json(
+            'quiz_api_autosave', {'answers': {first: 'a', second: 'b'}, 'current_index': 1}
+        )
+        self.assertEqual(response.json()['saved'], 2)
+        response = await self.post_json('quiz_api_submit', {'answers': {second: 'a'}})
+        self.assertEqual((response.json()['score'], response.json()['total_questions']), (2, 30))
+        self.assertEqual((await self.post_json('quiz_api_submit', {'answers': {}})).status_code, 409)
+
+    @override_settings(QUIZ_QUEUED_GRADING=True)
+    async def test_queued_submit(self):
+        await self.async_client.get(reverse('quiz_api', args=[self.quiz.id]))
+        response = await self.post_json('quiz_api_submit', {'answers': {}})
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(await PendingSubmission.objects.filter(id=response.json()['submission_id']).aexists())
+
+    async def test_bookmark(self):
+        question_id = (await self.quiz.questions.afirst()).id
+        url = reverse('bookmark_question')
+        for expected in (True, False):
+            response = await self.async_client.post(
+                url, data=json.dumps({'question_id': question_id}), content_type='application/json'
+            )
+            self.assertEqual(response.json()['bookmarked'], expected)
+        response = await self.async_client.post(
+            url, data=json.dumps({'question_id': 0, 'bookmarked': True}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+class SubmissionQueueTests(QuizTestCase):
+    """Final submissions queued for the background grader."""
+
+    @override_settings(QUIZ_QUEUED_GRADING=True)
+    def test_queued_submission(self):
+        progress.get_or_start(self.student, self.quiz)
+        response = self.assertIndexed(
+            'post', reverse('quiz_api_submit', args=[self.quiz.id]),
+            data=json.dumps({'answers': {}}), content_type='application/json'
+        )
+        grading_url = response.json()['results_url']
+        self.assertContains(self.assertIndexed('get', grading_url), 'Grading')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(submissions.grade_pending(), 1)
+        self.assertNoScans(ctx.captured_queries)
+        pending = PendingSubmission.objects.get()
+        self.assertRedirects(
+            self.client.get(grading_url), reverse('quiz_results', args=[pending.attempt_id])
+        )
+
+    def queue(self, count):
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        return [submissions.enqueue(self.student, self.quiz, questions, {}).id for _ in range(count)]
+
+    def test_claims_do_not_overlap(self):
+        ids = self.queue(5)
+        # What a second worker sees while the first is grading its claim.
+        first = submissions._claim(2)
+        self.assertEqual(first, ids[:2])
+        self.assertEqual(submissions._claim(10), ids[2:])
+        self.assertEqual(submissions._claim(10), [])
+        self.assertEqual(PendingSubmission.objects.filter(status='processing').count(), 5)
+        self.assertEqual(submissions.requeue_processing(), 5)
+        self.assertEqual(submissions.grade_pending(3), 3)
+        self.assertEqual(submissions.grade_pending(3), 2)
+        self.assertEqual(set(PendingSubmission.objects.values_list('status', flat=True)), {'done'})
+
+    def test_failed_batch_is_requeued(self):
+        ids = self.queue(2)
+        with mock.patch.object(PendingSubmission.objects, 'bulk_update', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                submissions.grade_pending()
+        self.assertEqual(
+            list(PendingSubmission.objects.filter(id__in=ids).values_list('status', 'attempt')),
+            [('pending', None), ('pending', None)],
+        )
+        self.assertEqual(QuizAttempt.objects.filter(user=self.student).count(), 1)
+        out = io.StringIO()
+        call_command('run_grader', once=True, requeue=True, stdout=out)
+        self.assertIn('Requeued 0 submissions.', out.getvalue())
+        self.assertIn('Graded 2 submissions in total.', out.getvalue())
+
+
+class BookmarkTests(QuizTestCase):
+    """Bookmark toggling and the batch endpoints."""
+
+    def test_bookmarks(self):
+        question_ids = list(self.quiz.questions.values_list('id', flat=True)[:3])
+        url = reverse('bookmark_question')
+        # The quiz page sends ids as strings.
+        response = self.assertIndexed(
+            'post', url, data=json.dumps({'question_id': str(question_ids[0])}), content_type='application/json'
+        )
+        self.assertTrue(response.json()['bookmarked'])
+        response = self.assertIndexed(
+            'post', url, data=json.dumps({'question_id': question_ids[0]}), content_type='application/json'
+        )
+        self.assertFalse(response.json()['bookmarked'])
+        self.assertIndexed(
+            'post', reverse('bookmarks_api'),
+            data=json.dumps({'question_ids': question_ids + [0]}), content_type='application/json'
+        )
+        response = self.assertIndexed('get', reverse('bookmarks_api') + f'?ids={question_ids[0]},{question_ids[1]}')
+        self.assertEqual(response.json()['bookmarked'], sorted(question_ids[:2]))
+        self.assertContains(self.assertIndexed('get', reverse('bookmarked_questions')), 'Question ', count=3)
+
+
+class CategoryRegistryTests(QuizTestCase):
+    """The process-wide category registry."""
+
+    def names(self):
+        return [category.name for category in categories.all_categories()]
+
+    def test_category_registry(self):
+        categories.all_categories()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('quiz_list'))
+        self.assertFalse([query for query in ctx.captured_queries if 'quiz_category' in query['sql']])
+        # This process's own changes show at once.
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Art', description='Art quizzes')
+        self.assertIn('Art', self.names())
+
+        # Another process's change sends no signal here; it shows once the check interval is up.
+        Category.objects.filter(name='Art').update(name='Fine art', updated_at=timezone.now())
+        self.assertIn('Art', self.names())
+        with mock.patch.object(categories, 'CHECK_INTERVAL', 0):
+            self.assertIn('Fine art', self.names())
+            Category.objects.filter(name='Fine art').delete()
+            self.assertNotIn('Fine art', self.names())
+            with CaptureQueriesContext(connection) as ctx:
+                self.names()
+            # Unchanged: the stamp query only.
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+
+class RoleGateTests(QuizTestCase):
+    """Role checks from the session, without a profile query."""
+
+    def test_role_gate(self):
+        # The user's profile comes joined to the user row; the role from the session.
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('quiz_list'))
+        self.assertFalse([query for query in ctx.captured_queries if 'FROM "quiz_profile"' in query['sql']])
+        self.client.force_login(self.teacher)
+        self.assertRedirects(self.client.get(reverse('quiz_list')), reverse('dashboard'))
+        self.assertEqual(self.client.get(reverse('quiz_api', args=[self.quiz.id])).status_code, 403)
+
+
+class ExportTests(QuizTestCase):
+    """Streamed CSV and JSON Lines exports."""
+
+    def test_export(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('export_results'), {'kind': 'answers', 'quiz': self.quiz.id})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 31)
+        self.assertTrue(lines[0].startswith('attempt_id,username'))
+        response = self.client.get(
+            reverse('export_results'), {'format': 'jsonl', 'class_section': '10A', 'start': '2000-01-01'}
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['score'] for row in rows], [30])
+        self.assertRedirects(
+            self.client.get(reverse('export_results'), {'quiz': 'x'}), reverse('dashboard'),
+            fetch_redirect_response=False
+        )
+
+
+class ItemAnalysisTests(QuizTestCase):
+    """Incrementally maintained item statistics."""
+
+    def test_item_analysis(self):
+        questions = list(self.quiz.questions.order_by('id')[:30])
+        self.assertEqual(item_analysis.update(self.quiz), 1)
+        # Three more students: all wrong (picking 'b'), first ten right, first twenty right.
+        for correct in (0, 10, 20):
+            answers = {question.id: 'a' if i < correct else 'b' for i, question in enumerate(questions)}
+            grade_submission(self.student, self.quiz, questions, answers)
+        self.assertEqual(item_analysis.update(self.quiz), 3)
+        self.assertEqual(item_analysis.update(self.quiz), 0)
+
+        self.client.force_login(self.teacher)
+        response = self.assertIndexed('get', reverse('item_analysis', args=[self.quiz.id]))
+        items = {item['question'].id: item for item in response.context['items']}
+        first = items[questions[0].id]
+        self.assertEqual((first['responses'], first['difficulty']), (4, 0.75))
+        self.assertEqual([d['count'] for d in first['distractors']], [3, 1, 0, 0])
+        # Point-biserial by hand: scores 1, 0, 1/3, 2/3; the item is right for all but the 0.
+        scores = [1, 0, 1 / 3, 2 / 3]
+        mean = sum(scores) / 4
+        sd = (sum((score - mean) ** 2 for score in scores) / 4) ** 0.5
+        expected = (sum(scores[i] for i in (0, 2, 3)) / 3 - 0) / sd * (0.75 * 0.25) ** 0.5
+        self.assertEqual(first['discrimination'], round(expected, 3))
+        unanswered = [item for item in items.values() if not item['responses']]
+        self.assertEqual(len(unanswered), 10)
+        self.assertIsNone(unanswered[0]['difficulty'])
+
+
+class AdaptiveSelectionTests(QuizTestCase):
+    """Question draws weighted by the student's accuracy."""
+
+    @override_settings(QUIZ_ADAPTIVE_SELECTION=True)
+    def test_adaptive_selection(self):
+        self.assertIndexed('get', reverse('start_quiz', args=[self.quiz.id]))
+        progress = InProgressAttempt.objects.get(user=self.student, quiz=self.quiz)
+        self.assertEqual(len(set(progress.question_ids)), 30)
+        self.assertIndexed('get', reverse('quiz_api', args=[self.quiz.id]))
+
+        # Half the bank is always answered right, half always wrong.
+        questions = list(self.quiz.questions.order_by('id'))
+        easy = {question.id for question in questions[:20]}
+        stale = adaptive.get_index(self.quiz)
+        # Submitting does no item analysis; the worker folds the attempts in later.
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(5):
+                grade_submission(self.student, self.quiz, questions,
+                                 {question.id: 'a' if question.id in easy else 'b' for question in questions})
+        self.assertFalse([q for q in ctx.captured_queries if 'quiz_questionstats' in q['sql']])
+
+        # A fold by another process leaves this one's cached index in use until a rebuild is due.
+        with mock.patch.object(adaptive, 'refresh'):
+            call_command('run_grader', once=True, stdout=io.StringIO())
+        self.assertEqual(self.quiz.questions.get(id=questions[0].id).stats.responses, 6)
+        self.assertEqual(adaptive.get_index(self.quiz), stale)
+        cache.delete(adaptive._rebuilt_key(self.quiz.id))
+        index = adaptive.get_index(self.quiz)
+        self.assertGreater(index['watermark'], stale['watermark'])
+        self.assertEqual(adaptive.get_index(self.quiz), index)
+        weakest, strongest = adaptive.bucket_for(0.2), adaptive.bucket_for(0.95)
+        weak = [question_id for seed in range(20) for question_id in adaptive.draw(index, weakest, seed, 10)]
+        strong = [question_id for seed in range(20) for question_id in adaptive.draw(index, strongest, seed, 10)]
+        self.assertGreater(sum(question_id in easy for question_id in weak), 150)
+        self.assertLess(sum(question_id in easy for question_id in strong), 50)
+
+
+class SyntheticDataTests(QuizTestCase):
+    """The synthetic data generator and the view benchmark."""
+
+    def test_synthetic_benchmark(self):
+        call_command('generate_synthetic_data', students=20, teachers=2, quizzes=1, questions=35, attempts=50,
+                     seed=1, stdout=io.StringIO())
+        self.assertEqual(Quiz.objects.filter(title__contains='quiz 1 (').count(), len(categories.all_categories()))
+        synthetic = User.objects.filter(username__startswith='synthetic-', profile__role='student')
+        self.assertEqual(synthetic.count(), 20)
+        attempts = QuizAttempt.objects.filter(user__in=synthetic).order_by('id')
+        self.assertEqual(attempts.count(), 50)
+        # Completion times rise with the ids and cover the default two-year span.
+        times = list(attempts.values_list('completed_at', flat=True))
+        self.assertEqual(times, sorted(times))
+        self.assertGreater(times[-1] - times[0], timedelta(days=700))
+        self.assertLess(times[-1], timezone.now())
+        # Totals are rebuilt after the bulk inserts.
+        self.assertEqual(StudentStats.objects.filter(user__in=synthetic).aggregate(n=Sum('attempt_count'))['n'], 50)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'run.json')
+            call_command('benchmark_views', iterations=2, warmup=0, output=output, stdout=io.StringIO())
+            with open(output) as handle:
+                endpoints = json.load(handle)['endpoints']
+        self.assertEqual(len(endpoints), 8)
+        self.assertEqual(endpoints['quiz_results']['requests'], 2)
+
+
+class RequestTimingTests(QuizTestCase):
+    """Server-Timing headers and the slow-request log."""
+
+    @override_settings(QUIZ_REQUEST_TIMING=True, QUIZ_SLOW_REQUEST_MS=60000, QUIZ_SLOW_REQUEST_QUERIES=3)
+    def test_request_timing(self):
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs('quiz.slow_requests') as logs:
+            response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+        self.assertRegex(timing, r'template;dur=[\d.]+, total;dur=[\d.]+$')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['view'], entry['user_id']), ('dashboard', self.student.id))
+        self.assertEqual(entry['queries'], len(ctx.captured_queries))
+
+        # Thresholds are read when the middleware stack is built.
+        with self.settings(QUIZ_SLOW_REQUEST_QUERIES=100):
+            client = Client()
+            client.force_login(self.student)
+            with self.assertNoLogs('quiz.slow_requests'):
+                response = client.get(reverse('quiz_api', args=[self.quiz.id]))
+        self.assertIn('Server-Timing', response)
+
+    # WhiteNoise is sync-only and would turn the whole stack synchronous.
+    @override_settings(
+        QUIZ_REQUEST_TIMING=True, ROOT_URLCONF='SmartEduQuiz1.async_urls',
+        MIDDLEWARE=[name for name in settings.MIDDLEWARE if not name.startswith('whitenoise.')],
+    )
+    async def test_async_request_timing(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('quiz_api', args=[self.quiz.id]))
+        queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing'])[1])
+        self.assertGreater(queries, 0)
+
+
+class AdminTests(QuizTestCase):
+    """Admin changelists and actions on the large tables."""
+
+    def test_admin_large_tables(self):
+        admin_user = User.objects.create(username='admin@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        for name, rows in (('quizattempt', 1), ('useranswer', 30)):
+            url = reverse(f'admin:quiz_{name}_changelist')
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {'username': self.student.username, 'p': 1})
+            self.assertEqual(response.context['cl'].result_count, rows)
+            # No per-row queries for __str__ and no full-table COUNT(*).
+            self.assertLess(len(ctx.captured_queries), 10)
+            self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith(f'SELECT COUNT(*) AS "__count" FROM "quiz_{name}"')])
+
+        url = reverse('admin:quiz_quizattempt_changelist')
+        response = self.client.post(url, {'action': 'delete_attempts', '_selected_action': [self.attempt.id]})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(QuizAttempt.objects.filter(id=self.attempt.id).exists())
+        self.assertFalse(StudentStats.objects.filter(user=self.student).exists())
+
+    def test_delete_attempts_releases_related_rows(self):
+        relations = {(rel.related_model, rel.on_delete.__name__) for rel in QuizAttempt._meta.related_objects}
+        # A new model pointing at QuizAttempt needs a row below, so its clean-up is checked.
+        self.assertEqual(relations, {
+            (UserAnswer, 'CASCADE'), (ArchivedAnswers, 'CASCADE'), (PendingSubmission, 'SET_NULL'),
+        })
+        archived = grade_submission(self.student, self.quiz, [], {})
+        ArchivedAnswers.objects.create(attempt=archived, question_ids=b'', options=b'', correct=b'')
+        pending = PendingSubmission.objects.create(
+            user=self.student, quiz=self.quiz, question_ids=[], answers={}, status='done', attempt=self.attempt
+        )
+        self.assertEqual(delete_attempts(QuizAttempt.objects.filter(quiz=self.quiz)), 2)
+        for rel in QuizAttempt._meta.related_objects:
+            self.assertFalse(
+                rel.related_model.objects.filter(**{f'{rel.field.name}__in': [self.attempt.id, archived.id]}).exists()
+            )
+        pending.refresh_from_db()
+        self.assertIsNone(pending.attempt_id)
+
+    def test_delete_attempts_rejects_unknown_relations(self):
+        protected = mock.Mock(
+            many_to_many=False, on_delete=models.PROTECT, related_model=UserAnswer,
+            field=UserAnswer._meta.get_field('attempt'),
+        )
+        # related_objects is a cached property, so the cached value is swapped.
+        with mock.patch.dict(QuizAttempt._meta.__dict__, {'related_objects': [protected]}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'does not apply PROTECT for UserAnswer.attempt'):
+                delete_attempts(QuizAttempt.objects.filter(quiz=self.quiz))
+        self.assertTrue(QuizAttempt.objects.filter(pk=self.attempt.pk).exists())
+
+
+class ArchiveTests(QuizTestCase):
+    """Packed answers of archived attempts."""
+
+    def export_answers(self):
+        response = self.client.get(reverse('export_results'), {'kind': 'answers', 'format': 'csv'})
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_archived_answers(self):
+        questions = list(self.quiz.questions.order_by('id')[:3])
+        # A wrong pick, a blank and free text that matches no option.
+        answers = {questions[0].id: 'b', questions[1].id: '', questions[2].id: 'z'}
+        attempt = grade_submission(self.student, self.quiz, questions, answers)
+        results_url = reverse('quiz_results', args=[attempt.id])
+        review = self.client.get(results_url).context['review_html']
+        self.client.force_login(self.teacher)
+        exported = self.export_answers()
+        items = item_analysis.analyse(self.quiz)
+
+        self.assertEqual(archive.archive_batch(attempt.completed_at + timedelta(seconds=1)), 2)
+        self.assertFalse(UserAnswer.objects.exists())
+        self.assertEqual(ArchivedAnswers.objects.get(attempt=attempt).other_answers, {'2': 'z'})
+        cache.clear()
+        item_analysis.reset(self.quiz.id)
+        self.assertEqual(item_analysis.analyse(self.quiz), items)
+        self.assertEqual(sorted(self.export_answers()), sorted(exported))
+        self.client.force_login(self.student)
+        self.assertEqual(self.assertIndexed('get', results_url).context['review_html'], review)
+
+        # Regrading reads the packed answers too.
+        Question.objects.filter(id=questions[0].id).update(correct_answer='b')
+        regrade_attempts(QuizAttempt.objects.filter(id=attempt.id))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 1)
+
+        self.assertEqual(archive.restore_batch(), 2)
+        self.assertEqual(
+            list(attempt.answers.order_by('id').values_list('selected_answer', 'is_correct')),
+            [('b', True), ('', False), ('z', False)],
+        )
+
+    def test_options_edited_after_archiving(self):
+        questions = list(self.quiz.questions.order_by('id')[:2])
+        attempt = grade_submission(
+            self.student, self.quiz, questions, {questions[0].id: 'b', questions[1].id: 'a'}
+        )
+        archive.archive_batch(attempt.completed_at + timedelta(seconds=1))
+        # Both wordings the batch saw are kept once per question.
+        self.assertEqual(ArchivedOptions.objects.filter(question__in=questions).count(), 2)
+        Question.objects.filter(id=questions[0].id).update(option2='B')
+        Question.objects.filter(id=questions[1].id).update(option1='A', correct_answer='A')
+
+        def picked():
+            return [answer.selected_answer for answer in archive.attempt_answers(attempt)]
+
+        self.assertEqual(picked(), ['b', 'a'])
+        self.client.force_login(self.teacher)
+        exported = [line for line in self.export_answers() if line.startswith(f'{attempt.id},')]
+        self.assertEqual([line.split(',')[6] for line in exported], ['b', 'a'])
+        # The old pick no longer matches the new key, as a live answer would not.
+        regrade_attempts(QuizAttempt.objects.filter(id=attempt.id))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 0)
+
+        archive.restore_batch()
+        self.assertEqual(
+            list(attempt.answers.order_by('id').values_list('selected_answer', 'is_correct')),
+            [('b', False), ('a', False)],
+        )
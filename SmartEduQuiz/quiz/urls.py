@@ -1,16 +1,33 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
-urlpatterns = [
-    path('', views.index, name='index'),
-    path('login/', views.login_view, name='login'),
-    path('register/', views.register_view, name='register'),
-    path('logout/', views.logout_view, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('quiz/create/', views.create_quiz, name='create_quiz'),
-    path('quiz/list/', views.quiz_list, name='quiz_list'),
-    path('quiz/list/<int:category_id>/', views.quiz_list_category, name='quiz_list_category'),
-    path('quiz/<int:quiz_id>/', views.start_quiz, name='start_quiz'),
-    path('quiz/results/<int:attempt_id>/', views.quiz_results, name='quiz_results'),
-    path('bookmark/', views.bookmark_question, name='bookmark_question'),
-]
\ No newline at end of file
+
+def build_urlpatterns(student_views):
+    """The app's URLs, with the student quiz-taking endpoints taken from ``student_views``."""
+    return [
+        path('', views.index, name='index'),
+        path('login/', views.login_view, name='login'),
+        path('register/', views.register_view, name='register'),
+        path('logout/', views.logout_view, name='logout'),
+        path('dashboard/', views.dashboard, name='dashboard'),
+        path('quiz/create/', views.create_quiz, name='create_quiz'),
+        path('roster/import/', views.import_roster, name='import_roster'),
+        path('reports/export/', views.export_results, name='export_results'),
+        path('reports/items/<int:quiz_id>/', views.item_analysis_report, name='item_analysis'),
+        path('quiz/list/', views.quiz_list, name='quiz_list'),
+        path('quiz/list/<int:category_id>/', views.quiz_list_category, name='quiz_list_category'),
+        path('quiz/<int:quiz_id>/', student_views.start_quiz, name='start_quiz'),
+        path('quiz/results/<int:attempt_id>/', views.quiz_results, name='quiz_results'),
+        path('quiz/grading/<int:submission_id>/', views.quiz_grading, name='quiz_grading'),
+        path('api/quiz/<int:quiz_id>/', student_views.quiz_api, name='quiz_api'),
+        path('api/quiz/<int:quiz_id>/autosave/', student_views.quiz_api_autosave, name='quiz_api_autosave'),
+        path('api/quiz/<int:quiz_id>/submit/', student_views.quiz_api_submit, name='quiz_api_submit'),
+        path('bookmark/', student_views.bookmark_question, name='bookmark_question'),
+        path('bookmarks/', views.bookmarked_questions, name='bookmarked_questions'),
+        path('api/bookmarks/', views.bookmarks_api, name='bookmarks_api'),
+    ]
+
+
+# Under an ASGI server the hot student endpoints can run as native coroutines.
+urlpatterns = build_urlpatterns(async_views if getattr(settings, 'QUIZ_ASYNC_VIEWS', False) else views)
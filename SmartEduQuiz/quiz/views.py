@@ -3,15 +3,27 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django import forms
-from django.db.models import Avg, Count
-from .models import Profile, Category, Quiz, Question, QuizAttempt, UserAnswer
-from django.http import JsonResponse
-import random
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Count
+from . import analytics, bookmarks, categories, exports, importers, item_analysis, leaderboard, progress, results, roster, submissions
+from .decorators import get_role, role_required
+from .grading import grade_submission
+from .models import (
+    Profile, Category, Quiz, QuizAttempt, StudentStats, CategoryStats, PendingSubmission, Bookmark
+)
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+import io
 import json
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+BOOKMARKS_PER_PAGE = 20
+
 class LoginForm(forms.Form):
     email = forms.EmailField(label="Email")
     password = forms.CharField(widget=forms.PasswordInput, label="Password")
@@ -25,19 +37,6 @@ class RegisterForm(forms.Form):
     class_section = forms.CharField(label="Class/Section", required=False)
     department = forms.CharField(label="Department", required=False)
 
-def initialize_categories():
-    """Create default categories if none exist."""
-    default_categories = [
-        {'name': 'Math', 'icon': '➕', 'description': 'Mathematics quizzes'},
-        {'name': 'Science', 'icon': '🔬', 'description': 'Science quizzes'},
-        {'name': 'History', 'icon': '📜', 'description': 'History quizzes'},
-        {'name': 'English', 'icon': '📜', 'description': 'English quizzes'},
-        {'name': 'Nepali', 'icon': '📜', 'description': 'Nepali quizzes'},
-    ]
-    for category in default_categories:
-        if not Category.objects.filter(name=category['name']).exists():
-            Category.objects.create(**category)
-
 def index(request):
     return render(request, 'index.html')
 
@@ -88,33 +87,38 @@ def logout_view(request):
 
 @login_required
 def dashboard(request):
-    if request.user.profile.role == 'student':
+    if get_role(request) == 'student':
         attempts = QuizAttempt.objects.filter(user=request.user)
-        quizzes_completed = attempts.count()
-        avg_score = attempts.aggregate(Avg('score'))['score__avg'] or 0
-        total_students = Profile.objects.filter(role='student').count()
-        class_rank = QuizAttempt.objects.filter(score__gt=avg_score).count() + 1 if avg_score else 1
-        weakest_subject = Category.objects.filter(quiz__quizattempt__user=request.user).annotate(
-            avg_score=Avg('quiz__quizattempt__score')
-        ).order_by('avg_score').first()
-        
+        totals = StudentStats.objects.filter(user=request.user).first()
+        quizzes_completed = totals.attempt_count if totals else 0
+        avg_score = totals.average_score if totals else 0
+        class_section = request.user.profile.class_section
+        class_rank = leaderboard.rank_of(totals, class_section) or 1
+        total_students = leaderboard.board_size(class_section) if totals else 0
+        category_totals = sorted(
+            CategoryStats.objects.filter(user=request.user).select_related('category'),
+            key=lambda row: row.average_score
+        )
+        weakest_subject = category_totals[0] if category_totals else None
+
         stats = {
             'quizzes_completed': quizzes_completed,
             'average_score': round(avg_score, 2),
             'quiz_progress': min(quizzes_completed * 10, 100),
             'class_rank': class_rank,
             'rank_progress': min(100 - (class_rank / total_students * 100), 100) if total_students else 100,
-            'weakest_subject': weakest_subject.name if weakest_subject else 'N/A',
-            'weakest_score': weakest_subject.avg_score if weakest_subject else 0
+            'weakest_subject': weakest_subject.category.name if weakest_subject else 'N/A',
+            'weakest_score': round(weakest_subject.average_score, 2) if weakest_subject else 0
         }
-        recent_attempts = attempts.order_by('-completed_at')[:3]
-        top_performers = QuizAttempt.objects.values('user').annotate(score=Avg('score')).order_by('-score')[:3]
-        for performer in top_performers:
-            performer['user'] = User.objects.get(id=performer['user'])
-            performer['score'] = round(performer['score'], 2)
-        focus_areas = Category.objects.filter(quiz__quizattempt__user=request.user).annotate(
-            score=Avg('quiz__quizattempt__score')
-        ).order_by('score')[:2]
+        recent_attempts = attempts.select_related('quiz__category').order_by('-completed_at')[:3]
+        top_performers = [
+            {'user': row.user, 'score': round(row.average_score, 2)}
+            for row in leaderboard.top_students(3)
+        ]
+        focus_areas = [
+            {'subject': row.category.name, 'score': round(row.average_score, 2)}
+            for row in category_totals[:2]
+        ]
         return render(request, 'student_dashboard.html', {
             'stats': stats,
             'recent_attempts': recent_attempts,
@@ -122,227 +126,433 @@ def dashboard(request):
             'focus_areas': focus_areas
         })
     else:
+        snapshot = analytics.class_snapshot()
+        my_quizzes = list(Quiz.objects.filter(created_by=request.user).order_by('-created_at').values('id', 'title'))
         stats = {
-            'total_students': Profile.objects.filter(role='student').count(),
-            'avg_class_score': QuizAttempt.objects.aggregate(Avg('score'))['score__avg'] or 0,
-            'quizzes_created': Quiz.objects.filter(created_by=request.user).count(),
-            'weakest_subject': Category.objects.filter(quiz__quizattempt__score__gt=0).annotate(
-                avg_score=Avg('quiz__quizattempt__score')
-            ).order_by('avg_score').first().name if Category.objects.filter(quiz__quizattempt__score__gt=0).exists() else 'N/A'
+            'total_students': snapshot['total_students'],
+            'avg_class_score': snapshot['avg_class_score'],
+            'quizzes_created': len(my_quizzes),
+            'weakest_subject': snapshot['weakest_subject']
         }
-        student_progress = QuizAttempt.objects.values('user', 'quiz__title').annotate(
-            score=Avg('score')
-        ).order_by('-score')[:3]
-        for progress in student_progress:
-            progress['student'] = User.objects.get(id=progress['user'])
-            progress['quiz_title'] = progress.pop('quiz__title')
-            progress['score'] = round(progress['score'], 2)
-        recent_quizzes = QuizAttempt.objects.values('quiz').annotate(
-            avg_score=Avg('score')
-        ).order_by('-quiz__created_at')[:3]
-        for result in recent_quizzes:
-            result['quiz'] = Quiz.objects.get(id=result['quiz'])
-            result['avg_score'] = round(result['avg_score'], 2)
-        categories = Category.objects.all()
+        student_progress = snapshot['student_progress']
+        recent_quizzes = snapshot['recent_quizzes']
+        category_list = categories.all_categories()
+        roster_imports = request.user.roster_imports.order_by('-id')[:3]
         return render(request, 'teacher_dashboard.html', {
             'stats': stats,
             'student_progress': student_progress,
             'recent_quizzes': recent_quizzes,
-            'categories': categories
+            'categories': category_list,
+            'my_quizzes': my_quizzes,
+            'roster_imports': roster_imports
         })
 
 @login_required
+@role_required('teacher', "Only teachers can create quizzes.")
 def create_quiz(request):
-    if request.user.profile.role != 'teacher':
-        messages.error(request, "Only teachers can create quizzes.")
-        return redirect('dashboard')
-    
-    # Initialize default categories if none exist
-    initialize_categories()
-    
     if request.method == 'POST':
         title = request.POST.get('title')
         category_id = request.POST.get('category')
         questions_text = request.POST.get('questions')
-        
-        if not title or not category_id or not questions_text:
+        questions_file = request.FILES.get('questions_file')
+        question_format = request.POST.get('format', 'pipe')
+
+        if not title or not category_id or not (questions_text or questions_file):
             messages.error(request, "All fields are required.")
             return redirect('dashboard')
-        
+
+        if question_format == 'auto':
+            question_format = importers.guess_format(questions_file.name) if questions_file else 'pipe'
+        if question_format not in importers.FORMATS:
+            messages.error(request, "Unsupported question format.")
+            return redirect('dashboard')
+
         try:
-            category = Category.objects.get(id=category_id)
-        except Category.DoesNotExist:
+            category = categories.get_category(int(category_id))
+        except ValueError:
+            category = None
+        if category is None:
             messages.error(request, "Selected category does not exist.")
             return redirect('dashboard')
-        
-        quiz = Quiz.objects.create(title=title, category=category, created_by=request.user)
-        for line in questions_text.strip().split('\n'):
-            parts = line.split('|')
-            if len(parts) == 6:
-                Question.objects.create(
-                    quiz=quiz,
-                    text=parts[0].strip(),
-                    option1=parts[1].strip(),
-                    option2=parts[2].strip(),
-                    option3=parts[3].strip(),
-                    option4=parts[4].strip(),
-                    correct_answer=parts[5].strip()
-                )
-            else:
-                messages.warning(request, f"Invalid question format: {line}. Skipping.")
-        messages.success(request, "Quiz created successfully!")
+
+        if questions_file:
+            lines = importers.decode_lines(questions_file)
+        else:
+            lines = io.StringIO(questions_text)
+        try:
+            with transaction.atomic():
+                quiz = Quiz.objects.create(title=title, category=category, created_by=request.user)
+                report = importers.import_questions(quiz, lines, question_format)
+        except UnicodeDecodeError:
+            messages.error(request, "The uploaded file must be UTF-8 encoded.")
+            return redirect('dashboard')
+        if report.skipped:
+            messages.warning(request, report.summary())
+        messages.success(request, f"Quiz created successfully with {report.created} questions!")
         return redirect('dashboard')
     
-    categories = Category.objects.all()
-    if not categories:
+    category_list = categories.all_categories()
+    if not category_list:
         messages.error(request, "No categories available. Please create a category first.")
         return redirect('dashboard')
-    return render(request, 'create_quiz.html', {'categories': categories})
+    return render(request, 'create_quiz.html', {'categories': category_list})
 
 @login_required
-def quiz_list(request):
-    if request.user.profile.role != 'student':
+@role_required('teacher', "Only teachers can import student rosters.")
+def import_roster(request):
+    roster_file = request.FILES.get('roster_file')
+    if request.method != 'POST' or not roster_file:
+        messages.error(request, "Choose a roster CSV file to upload.")
+        return redirect('dashboard')
+    try:
+        text = roster_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        messages.error(request, "The uploaded file must be UTF-8 encoded.")
         return redirect('dashboard')
-    # Ensure categories exist for quiz listing
-    initialize_categories()
-    categories = Category.objects.all()
-    return render(request, 'quiz_list.html', {'categories': categories})
+    # Hashing thousands of passwords outlasts a request; the import_roster
+    # --queued worker creates the accounts and records the report.
+    roster.enqueue(request.user, text, request.POST.get('class_section') or None)
+    messages.success(request, "Roster uploaded; the students will be added shortly.")
+    return redirect('dashboard')
 
 @login_required
-def quiz_list_category(request, category_id):
-    if request.user.profile.role != 'student':
+@role_required('teacher', "Only teachers can export results.")
+def export_results(request):
+    """Stream attempts or answers as CSV or JSON Lines, filtered by the query string."""
+    kind = request.GET.get('kind', 'attempts')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in exports.KINDS or fmt not in exports.FORMATS:
+        messages.error(request, "Unknown export type.")
+        return redirect('dashboard')
+    try:
+        names, rows = exports.export_rows(kind, request.GET)
+    except ValueError as exc:
+        messages.error(request, f"Invalid export filter: {exc}.")
         return redirect('dashboard')
-    category = get_object_or_404(Category, id=category_id)
-    quizzes = Quiz.objects.filter(category=category)
+    response = StreamingHttpResponse(exports.stream(fmt, names, rows), content_type=exports.CONTENT_TYPES[fmt])
+    filename = f"quiz-{kind}-{timezone.now():%Y%m%d-%H%M}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+@role_required('teacher', "Only teachers can view item analysis.")
+def item_analysis_report(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    return render(request, 'item_analysis.html', {'quiz': quiz, 'items': item_analysis.analyse(quiz)})
+
+@login_required
+@role_required('student')
+def quiz_list(request):
+    return render(request, 'quiz_list.html', {'categories': categories.all_categories()})
+
+@login_required
+@role_required('student')
+def quiz_list_category(request, category_id):
+    category = categories.get_category(category_id)
+    if category is None:
+        raise Http404("No such category.")
+    quizzes = Quiz.objects.filter(category=category).annotate(question_count=Count('questions'))
     return render(request, 'quiz_list_category.html', {'category': category, 'quizzes': quizzes})
 
 
 @login_required
+@role_required('student')
 def start_quiz(request, quiz_id):
-    if request.user.profile.role != 'student':
-        return redirect('dashboard')
-        
     quiz = get_object_or_404(Quiz, id=quiz_id)
-    session_key = f'quiz_{quiz_id}_{request.user.id}'
-
-    # Load questions from session if already saved
-    session_data = request.session.get(session_key, {})
-    if not session_data.get('questions'):
-        # Select and save random questions to session
-        questions = list(quiz.questions.all())
-        random.shuffle(questions)
-        selected_questions = questions[:30]  # you can adjust number
-        question_ids = [q.id for q in selected_questions]
-        request.session[session_key] = {
-            'questions': question_ids,
-            'current_index': 0,
-            'answers': {}
-        }
-        request.session.modified = True
-    else:
-        question_ids = session_data['questions']
-        selected_questions = list(quiz.questions.filter(id__in=question_ids))
-        # Maintain original order
-        selected_questions.sort(key=lambda q: question_ids.index(q.id))
+
+    state = progress.get_or_start(request.user, quiz)
+    selected_questions = progress.selected_questions(state, quiz)
+    if not selected_questions:
+        progress.discard(state)
+        messages.error(request, "This quiz has no questions yet.")
+        return redirect('quiz_list')
+    answers = progress.load_answers(state)
+    current_index = min(state.current_index, len(selected_questions) - 1)
 
     if request.method == 'POST':
-        action = request.POST.get('action')
-        current_index = int(request.session[session_key]['current_index'])
-        answers = request.session[session_key]['answers']
         selected_answer = request.POST.get('answer')
-
         if selected_answer:
-            answers[str(current_index)] = selected_answer
+            question_id = selected_questions[current_index].id
+            answers[question_id] = selected_answer
+            progress.save_answer(state, question_id, selected_answer)
 
-        if action == 'previous' and current_index > 0:
-            current_index -= 1
-        elif action == 'next':
-            if current_index < len(selected_questions) - 1:
-                current_index += 1
-            else:
-                # Submit quiz
-                attempt = QuizAttempt.objects.create(
-                    user=request.user,
-                    quiz=quiz,
-                    total_questions=len(selected_questions)
-                )
-                score = 0
-                for idx, question in enumerate(selected_questions):
-                    user_answer = answers.get(str(idx))
-                    is_correct = user_answer == question.correct_answer
-                    if is_correct:
-                        score += 1
-                    UserAnswer.objects.create(
-                        attempt=attempt,
-                        question=question,
-                        selected_answer=user_answer or '',
-                        is_correct=is_correct
-                    )
-                attempt.score = score
-                attempt.save()
-                request.session.pop(session_key, None)
-                return redirect('quiz_results', attempt_id=attempt.id)
-
-        # Update session
-        request.session[session_key]['current_index'] = current_index
-        request.session[session_key]['answers'] = answers
-        request.session.modified = True
-
-    current_index = request.session[session_key]['current_index']
-    user_answer = request.session[session_key]['answers'].get(str(current_index), '')
-    bookmarked_questions = request.session.get('bookmarked_questions', [])
+        current_index = _step(request.POST.get('action'), current_index, len(selected_questions))
+        if current_index is None:
+            return _submitted_redirect(
+                request, _submit_attempt(request.user, quiz, state, selected_questions, answers)
+            )
+        progress.save_position(state, current_index=current_index)
+
+    bookmarked_questions = bookmarks.bookmarked_ids(request.user, [selected_questions[current_index].id])
+    return _quiz_page(request, quiz, selected_questions, current_index, answers, bookmarked_questions)
+
+# Helpers shared with quiz.async_views: everything but the database and cache calls.
+
+def _step(action, current_index, question_count):
+    """Return the question index the form's ``action`` moves to, or None when it submits."""
+    if action == 'previous' and current_index > 0:
+        return current_index - 1
+    if action == 'next':
+        return current_index + 1 if current_index < question_count - 1 else None
+    return current_index
 
+def _quiz_page(request, quiz, selected_questions, current_index, answers, bookmarked_questions):
+    current_question = selected_questions[current_index]
     return render(request, 'quiz.html', {
         'quiz': quiz,
         'questions': selected_questions,
-        'current_question': selected_questions[current_index],
+        'current_question': current_question,
         'current_question_index': current_index,
-        'user_answer': user_answer,
+        'user_answer': answers.get(current_question.id, ''),
         'bookmarked_questions': bookmarked_questions,
         'progress': ((current_index + 1) / len(selected_questions)) * 100
     })
 
+def _post_json(request):
+    """Return ``(data, None)`` for a POST with a JSON object body, else ``(None, error response)``."""
+    if request.method != 'POST':
+        return None, JsonResponse({'status': 'error'}, status=400)
+    data = _read_json(request)
+    if data is None:
+        return None, JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+    return data, None
+
+def _read_json(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def _clean_answers(data, selected_questions):
+    """Keep only string answers to questions that belong to the attempt."""
+    answers = data.get('answers')
+    if not isinstance(answers, dict):
+        return {}
+    allowed = {question.id for question in selected_questions}
+    cleaned = {}
+    for question_id, selected_answer in answers.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            continue
+        if question_id in allowed and isinstance(selected_answer, str) and selected_answer:
+            cleaned[question_id] = selected_answer[:200]
+    return cleaned
+
 @login_required
-def quiz_results(request, attempt_id):
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
-    score_percentage = round((attempt.score / attempt.total_questions) * 100, 2)
-    user_answers = UserAnswer.objects.filter(attempt=attempt)
-
-    return render(request, 'quiz_results.html', {
-        'attempt': attempt,
-        'score_percentage': score_percentage,
-        'user_answers': user_answers
+@role_required('student', "Only students can take quizzes.", json_status=403)
+def quiz_api(request, quiz_id):
+    """Return the attempt's whole question set, without answer keys, in one payload."""
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    state = progress.get_or_start(request.user, quiz)
+    selected_questions = progress.selected_questions(state, quiz)
+    answers = progress.load_answers(state)
+    bookmarked = bookmarks.bookmarked_ids(request.user, [question.id for question in selected_questions])
+    return _quiz_payload(quiz, state, selected_questions, answers, bookmarked)
+
+def _quiz_payload(quiz, state, selected_questions, answers, bookmarked):
+    return JsonResponse({
+        'quiz': {'id': quiz.id, 'title': quiz.title},
+        'questions': [
+            {'id': question.id, 'text': question.text, 'options': question.options}
+            for question in selected_questions
+        ],
+        'answers': {str(question_id): text for question_id, text in answers.items()},
+        'current_index': min(state.current_index, max(len(selected_questions) - 1, 0)),
+        'bookmarked_questions': sorted(bookmarked),
+    })
+
+@login_required
+@role_required('student', json_status=400)
+def quiz_api_autosave(request, quiz_id):
+    """Upsert a batch of answers and the current position without submitting."""
+    data, error = _post_json(request)
+    if error:
+        return error
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    state = progress.get_live(request.user, quiz)
+    if state is None:
+        return _no_attempt()
+    selected_questions = progress.selected_questions(state, quiz)
+    answers = _clean_answers(data, selected_questions)
+    if answers:
+        progress.save_answers(state, answers)
+    current_index = _autosave_index(data, selected_questions)
+    if current_index is not None:
+        progress.save_position(state, current_index=current_index)
+    return JsonResponse({'status': 'success', 'saved': len(answers)})
+
+def _autosave_index(data, selected_questions):
+    current_index = data.get('current_index')
+    if isinstance(current_index, int) and 0 <= current_index < len(selected_questions):
+        return current_index
+    return None
+
+def _submit_attempt(user, quiz, state, selected_questions, answers):
+    """Claim the in-progress attempt and grade it, or queue it for run_grader.
+
+    Returns the QuizAttempt or PendingSubmission, or None when another request
+    (a second tab, a replayed POST) submitted this attempt first.
+    """
+    with transaction.atomic():
+        if not progress.claim(state):
+            return None
+        if submissions.queued():
+            return submissions.enqueue(user, quiz, selected_questions, answers, user.profile.class_section)
+        return grade_submission(user, quiz, selected_questions, answers, user.profile.class_section)
+
+def _submitted_redirect(request, result):
+    if result is None:
+        messages.info(request, "This quiz attempt has already been submitted.")
+        return redirect('dashboard')
+    if isinstance(result, PendingSubmission):
+        return redirect('quiz_grading', submission_id=result.id)
+    return redirect('quiz_results', attempt_id=result.id)
+
+def _no_attempt():
+    # The page outlived its attempt: submitted elsewhere, or expired.
+    return JsonResponse({
+        'status': 'error',
+        'message': "This quiz attempt was already submitted or has expired. Reload the page to start again.",
+    }, status=409)
+
+def _submitted_response(result):
+    if result is None:
+        return _no_attempt()
+    if isinstance(result, PendingSubmission):
+        return JsonResponse({
+            'status': 'success',
+            'queued': True,
+            'submission_id': result.id,
+            'results_url': reverse('quiz_grading', args=[result.id]),
+        }, status=202)
+    return JsonResponse({
+        'status': 'success',
+        'attempt_id': result.id,
+        'score': result.score,
+        'total_questions': result.total_questions,
+        'results_url': reverse('quiz_results', args=[result.id]),
     })
 
+@login_required
+@role_required('student', json_status=400)
+def quiz_api_submit(request, quiz_id):
+    """Grade a complete answer sheet in one request."""
+    data, error = _post_json(request)
+    if error:
+        return error
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    # Never start an attempt here: that would grade an empty sheet.
+    state = progress.get_live(request.user, quiz)
+    if state is None:
+        return _no_attempt()
+    selected_questions = progress.selected_questions(state, quiz)
+    if not selected_questions:
+        return JsonResponse({'status': 'error', 'message': 'This quiz has no questions yet.'}, status=400)
+    answers = progress.load_answers(state)
+    answers.update(_clean_answers(data, selected_questions))
+    return _submitted_response(_submit_attempt(request.user, quiz, state, selected_questions, answers))
+
+@login_required
+def quiz_results(request, attempt_id):
+    attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz'), id=attempt_id, user=request.user)
+    # Revalidated by ETag alone: completed_at never changes, but regrades and question edits do.
+    etag = results.attempt_etag(attempt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        score_percentage = round((attempt.score / attempt.total_questions) * 100, 2) if attempt.total_questions else 0
+        response = render(request, 'quiz_results.html', {
+            'attempt': attempt,
+            'score_percentage': score_percentage,
+            'review_html': results.render_review(attempt)
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
+
+@login_required
+def quiz_grading(request, submission_id):
+    """Show a "grading" page for a queued submission until run_grader has scored it."""
+    pending = get_object_or_404(
+        PendingSubmission.objects.select_related('quiz'), id=submission_id, user=request.user
+    )
+    if pending.status == 'done' and pending.attempt_id:
+        return redirect('quiz_results', attempt_id=pending.attempt_id)
+    if pending.status == 'failed':
+        messages.error(request, "Your submission could not be graded. Please contact your teacher.")
+        return redirect('dashboard')
+    response = render(request, 'quiz_results.html', {'grading': True, 'quiz': pending.quiz})
+    response['Refresh'] = '3'
+    patch_cache_control(response, no_store=True)
+    return response
+
 @login_required
 def bookmark_question(request):
+    """Toggle one bookmark, or set it when the payload says ``bookmarked``."""
+    question_id, wanted = _bookmark_request(request)
+    if question_id is None:
+        return JsonResponse({'status': 'error'}, status=400)
+    if wanted is None:
+        state = bookmarks.toggle(request.user, question_id)
+    elif wanted:
+        state = True if bookmarks.add(request.user, [question_id]) else None
+    else:
+        bookmarks.remove(request.user, [question_id])
+        state = False
+    return _bookmark_response(question_id, state)
+
+def _bookmark_request(request):
+    """Return ``(question_id, wanted)``: wanted is None to toggle; question_id is None if invalid."""
+    data = _read_json(request) if request.method == 'POST' else None
+    question_ids = bookmarks.clean_ids(data.get('question_id')) if data else []
+    if not question_ids:
+        return None, None
+    return question_ids[0], bool(data['bookmarked']) if 'bookmarked' in data else None
+
+def _bookmark_response(question_id, state):
+    if state is None:
+        return JsonResponse({'status': 'error', 'message': 'No such question.'}, status=404)
+    return JsonResponse({'status': 'success', 'question_id': question_id, 'bookmarked': state})
+
+@login_required
+def bookmarks_api(request):
+    """Batch bookmark access.
+
+    GET ``?ids=1,2,3`` returns which of those questions are bookmarked (all of
+    them without ``ids``); POST ``{"question_ids": [...], "bookmarked": bool}``
+    adds or removes them in one statement.
+    """
     if request.method == 'POST':
-        data = json.loads(request.body)
-        question_id = data.get('question_id')
-        bookmarked = request.session.get('bookmarked_questions', [])
-        if question_id in bookmarked:
-            bookmarked.remove(question_id)
+        data = _read_json(request)
+        if data is None or not isinstance(data.get('question_ids'), list):
+            return JsonResponse({'status': 'error', 'message': 'Expected a question_ids list.'}, status=400)
+        question_ids = bookmarks.clean_ids(data['question_ids'])
+        bookmarked = bool(data.get('bookmarked', True))
+        if bookmarked:
+            question_ids = bookmarks.add(request.user, question_ids)
         else:
-            bookmarked.append(question_id)
-        request.session['bookmarked_questions'] = bookmarked
-        request.session.modified = True
-        return JsonResponse({'status': 'success'})
-    return JsonResponse({'status': 'error'}, status=400)
+            bookmarks.remove(request.user, question_ids)
+        return JsonResponse({'status': 'success', 'question_ids': question_ids, 'bookmarked': bookmarked})
+    ids = request.GET.get('ids')
+    question_ids = bookmarks.clean_ids(ids.split(',')) if ids else None
+    return JsonResponse({'bookmarked': sorted(bookmarks.bookmarked_ids(request.user, question_ids))})
 
 @login_required
+@role_required('student', "Only students can view bookmarked questions.")
 def bookmarked_questions(request):
-    if request.user.profile.role != 'student':
-        messages.error(request, "Only students can view bookmarked questions.")
-        return redirect('dashboard')
-    bookmarked_ids = request.session.get('bookmarked_questions', [])
-    questions = Question.objects.filter(id__in=bookmarked_ids)
-    return render(request, 'bookmarked_questions.html', {'questions': questions})
+    saved = Bookmark.objects.filter(user=request.user).select_related(
+        'question__quiz__category'
+    ).order_by('-created_at')
+    page = Paginator(saved, BOOKMARKS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'bookmark_question.html', {
+        'page': page,
+        'questions': [bookmark.question for bookmark in page],
+    })
 
 @login_required
+@role_required('teacher', "Only teachers can create categories.")
 def create_category(request):
-    if request.user.profile.role != 'teacher':
-        messages.error(request, "Only teachers can create categories.")
-        return redirect('dashboard')
     if request.method == 'POST':
         name = request.POST.get('name')
         icon = request.POST.get('icon', '📚')